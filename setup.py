@@ -42,6 +42,34 @@ setup(
         + "\n\n"
         + read("src", "z3c", "table", "column.rst")
         + "\n\n"
+        + read("src", "z3c", "table", "filter.rst")
+        + "\n\n"
+        + read("src", "z3c", "table", "rowdiff.rst")
+        + "\n\n"
+        + read("src", "z3c", "table", "conditional.rst")
+        + "\n\n"
+        + read("src", "z3c", "table", "rowrange.rst")
+        + "\n\n"
+        + read("src", "z3c", "table", "parallel.rst")
+        + "\n\n"
+        + read("src", "z3c", "table", "sortindex.rst")
+        + "\n\n"
+        + read("src", "z3c", "table", "persistent.rst")
+        + "\n\n"
+        + read("src", "z3c", "table", "writer.rst")
+        + "\n\n"
+        + read("src", "z3c", "table", "compact.rst")
+        + "\n\n"
+        + read("src", "z3c", "table", "budget.rst")
+        + "\n\n"
+        + read("src", "z3c", "table", "aggregate.rst")
+        + "\n\n"
+        + read("src", "z3c", "table", "group.rst")
+        + "\n\n"
+        + read("src", "z3c", "table", "collation.rst")
+        + "\n\n"
+        + read("src", "z3c", "table", "stats.rst")
+        + "\n\n"
         + read("src", "z3c", "table", "miscellaneous.rst")
         + "\n\n"
         + read("CHANGES.rst")
@@ -71,7 +99,19 @@ setup(
     include_package_data=True,
     python_requires='>=3.9',
     extras_require=dict(
+        benchmark=[
+            "ZODB",
+            "zope.container",
+            "zope.publisher",
+            "zope.site",
+        ],
+        icu=["PyICU"],
+        sortindex=[
+            "ZODB",
+            "zope.configuration",
+        ],
         test=[
+            "ZODB",
             "zope.container",
             "zope.publisher",
             "zope.site",
@@ -81,18 +121,29 @@ setup(
     ),
     install_requires=[
         "setuptools",
+        "BTrees",
         "future>=0.14.0",
+        "persistent",
         "z3c.batching>=1.1.0",
+        "zope.annotation",
         "zope.component",
         "zope.contentprovider",
         "zope.dublincore",
+        "zope.event",
         "zope.i18nmessageid",
         "zope.i18n",
         "zope.interface",
+        "zope.lifecycleevent",
         "zope.location",
         "zope.schema",
         "zope.security",
         "zope.traversing",
     ],
+    entry_points={
+        "console_scripts": [
+            "z3c.table-benchmark = z3c.table.benchmark:main",
+            "z3c.table-rebuild-sortindex = z3c.table.sortindex:main",
+        ],
+    },
     zip_safe=False,
 )
@@ -0,0 +1,71 @@
+##############################################################################
+#
+# Copyright (c) 2008 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Column aggregates
+"""
+__docformat__ = "reStructuredText"
+
+import zope.interface
+
+from z3c.table import interfaces
+
+
+# the aggregate names in footer row order
+AGGREGATES = ("count", "sum", "average", "min", "max")
+
+
+@zope.interface.implementer(interfaces.IAggregate)
+class Aggregate:
+    """Count, sum, minimum and maximum of the added values."""
+
+    def __init__(self, names=()):
+        self.names = tuple(names)
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+        # only numbers can get summed up, only comparable values give a
+        # minimum and maximum
+        self.summing = "sum" in self.names or "average" in self.names
+        self.comparing = "min" in self.names or "max" in self.names
+
+    def add(self, value):
+        if value is None:
+            # missing values don't count
+            return
+        self.count += 1
+        if self.summing:
+            self.sum += value
+        if self.comparing:
+            if self.min is None or value < self.min:
+                self.min = value
+            if self.max is None or value > self.max:
+                self.max = value
+
+    @property
+    def average(self):
+        if not self.count:
+            return None
+        return self.sum / self.count
+
+    def getValue(self, name):
+        if name not in AGGREGATES:
+            raise ValueError("Unknown aggregate %r" % name)
+        return getattr(self, name)
+
+    def __repr__(self):
+        return "<{} {}>".format(
+            self.__class__.__name__,
+            " ".join(f"{name}={self.getValue(name)!r}"
+                     for name in self.names),
+        )
@@ -88,6 +88,10 @@ class BatchProvider:
             value = self.request.get(key, None)
             if value:
                 args.update({key: value})
+        # tables not based on Table don't know about filters
+        getFilterArgs = getattr(self.table, "getFilterQueryStringArgs", None)
+        if getFilterArgs is not None:
+            args.update(getFilterArgs())
         return args
 
     def renderBatchLink(self, batch, cssClass=None):
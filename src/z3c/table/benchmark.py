@@ -0,0 +1,503 @@
+##############################################################################
+#
+# Copyright (c) 2008 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Benchmark the table pipeline
+
+Builds synthetic container and sequence datasets and times every phase of
+``Table.update`` and ``Table.render`` separately using the table statistics.
+The results are written as JSON and can get compared with the results of
+another run::
+
+  z3c.table-benchmark --sizes 1000,10000 --output before.json
+  z3c.table-benchmark --sizes 1000,10000 --compare before.json
+
+Parallel rendering gets compared by running the parallel safe columns with
+and without ``--render-processes``::
+
+  z3c.table-benchmark --columns getattr,getitem --batch-size 0 \\
+    --output serial.json
+  z3c.table-benchmark --columns getattr,getitem --batch-size 0 \\
+    --render-processes 4 --compare serial.json
+
+The compact output mode gets compared the same way, the counts contain the
+size of the rendered table in ``renderedBytes``::
+
+  z3c.table-benchmark --output indented.json
+  z3c.table-benchmark --compact --css-classes-on-cols \\
+    --compare indented.json
+
+Sorting by collation keys gets compared with plain sorting, e.g. on the
+title column::
+
+  z3c.table-benchmark --columns getattr --sort-on 0 --output plain.json
+  z3c.table-benchmark --columns getattr --sort-on 0 --collate \\
+    --compare plain.json
+
+The import time of the table modules gets measured in fresh interpreters
+using ``python -X importtime``, the best run counts::
+
+  z3c.table-benchmark --import-time --sizes 0
+
+The benchmark uses the test setup and requires the ``benchmark`` extra.
+"""
+__docformat__ = "reStructuredText"
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+
+import zope.component
+import zope.interface
+from zope.location.interfaces import ILocation
+
+from z3c.table import batch
+from z3c.table import column
+from z3c.table import interfaces
+from z3c.table import parallel
+from z3c.table import table
+
+
+try:
+    from zope.publisher.browser import TestRequest
+    from zope.publisher.interfaces.browser import IBrowserRequest
+
+    from z3c.table import testing
+except ImportError as e:
+    raise ImportError(
+        f"The benchmark requires the benchmark extra, install "
+        f"z3c.table[benchmark]: {e}"
+    ) from e
+
+
+DEFAULT_SIZES = "1000,10000,100000"
+
+# the top level phases, values is part of setUpRows and renderRows is part
+# of render
+PHASES = (
+    "initColumns",
+    "updateColumns",
+    "setUpRows",
+    "sortRows",
+    "batchRows",
+    "updateBatch",
+    "render",
+    "renderBatch",
+)
+
+NESTED_PHASES = (
+    "values",
+    "renderRows",
+)
+
+# modules the import time gets measured for
+IMPORT_MODULES = (
+    "z3c.table.column",
+    "z3c.table.table",
+)
+
+# modules which only get imported when a table or column uses them
+LAZY_MODULES = (
+    "email.utils",
+    "xml.sax",
+    "z3c.batching",
+    "z3c.table.collation",
+    "z3c.table.parallel",
+    "z3c.table.sortindex",
+    "zope.dublincore",
+    "zope.traversing",
+)
+
+
+class Content(testing.Content):
+    """Sample content which also offers its attributes as items."""
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+
+@zope.interface.implementer(ILocation)
+class Sequence(list):
+    """Located sequence used as sequence table context."""
+
+    __parent__ = None
+    __name__ = None
+
+
+# column type name, column class and column attributes
+COLUMNS = (
+    ("name", column.NameColumn, {}),
+    ("radio", column.RadioColumn, {}),
+    ("checkbox", column.CheckBoxColumn, {}),
+    ("getattr", column.GetAttrColumn, {"attrName": "title"}),
+    ("getitem", column.GetItemColumn, {"idx": "number"}),
+    ("i18ngetattr", column.I18nGetAttrColumn, {"attrName": "title"}),
+    ("created", column.CreatedColumn, {}),
+    ("modified", column.ModifiedColumn, {}),
+    ("link", column.LinkColumn, {}),
+    ("email", column.EMailColumn, {"attrName": "title"}),
+    ("selecteditem", column.SelectedItemColumn, {}),
+)
+
+
+def getColumnTypes(names):
+    """Returns the column definitions for the given column type names."""
+    if names == "all":
+        return COLUMNS
+    names = names.split(",")
+    columns = [col for col in COLUMNS if col[0] in names]
+    if len(columns) != len(names):
+        raise ValueError("Unknown column type in %r" % names)
+    return columns
+
+
+def getColumnDefinitions(columnTypes):
+    """Returns the column definitions for the given column types."""
+    return tuple(
+        column.ColumnDefinition(class_, name, weight=idx, **kws)
+        for idx, (name, class_, kws) in enumerate(columnTypes)
+    )
+
+
+class BenchmarkMixin:
+    """Table setting up the benchmark columns."""
+
+    columnTypes = COLUMNS
+
+    def setUpColumns(self):
+        return [
+            column.addColumn(self, class_, name, weight=idx, **kws)
+            for idx, (name, class_, kws) in enumerate(self.columnTypes)
+        ]
+
+
+class BenchmarkTable(BenchmarkMixin, table.Table):
+    """Container benchmark table."""
+
+
+class BenchmarkSequenceTable(BenchmarkMixin, table.SequenceTable):
+    """Sequence benchmark table."""
+
+
+def setUp():
+    """Setup the component registrations used by the benchmark."""
+    import zope.traversing.testing
+    from zope.site.testing import siteSetUp
+    root = siteSetUp(True)
+    zope.traversing.testing.setUp()
+    zope.component.provideAdapter(testing.DublinCoreAdapterStub)
+    testing.setUpAdapters()
+    zope.component.provideAdapter(
+        batch.BatchProvider,
+        (zope.interface.Interface, IBrowserRequest, interfaces.ITable),
+        interfaces.IBatchProvider,
+        name="batch",
+    )
+    return root
+
+
+def tearDown():
+    from zope.site.testing import siteTearDown
+    siteTearDown()
+
+
+def makeContainer(root, size):
+    """Returns a located container with size items."""
+    container = testing.Container()
+    root["container-%s" % size] = container
+    for idx in range(size):
+        container["item-%07d" % idx] = Content("Title %s" % idx, size - idx)
+    return container
+
+
+def makeTable(kind, container, request, columnTypes, sortOn=0,
+              definitions=None, renderProcesses=0, compact=False,
+              cssClassesOnCols=False, collateSortKeys=False):
+    if kind == "sequence":
+        sequence = Sequence(container.values())
+        sequence.__parent__ = container
+        sequence.__name__ = "sequence"
+        tbl = BenchmarkSequenceTable(sequence, request)
+    else:
+        tbl = BenchmarkTable(container, request)
+    tbl.__parent__ = container
+    tbl.__name__ = "benchmark.html"
+    tbl.columnTypes = columnTypes
+    tbl.columnDefinitions = definitions
+    tbl.renderProcesses = renderProcesses
+    tbl.compact = compact
+    tbl.cssClassesOnCols = cssClassesOnCols
+    tbl.collateSortKeys = collateSortKeys
+    tbl.sortOn = sortOn
+    return tbl
+
+
+def timePhases(tbl):
+    """Runs update and render and returns the phase timings and counts."""
+    tbl.collectStats = True
+    tbl.update()
+    result = tbl.render()
+    tbl.renderBatch()
+    timings = dict.fromkeys(PHASES + NESTED_PHASES, 0.0)
+    timings.update(tbl.stats.durations)
+    counts = dict(tbl.stats.counts)
+    counts["renderedBytes"] = len(result.encode("utf-8"))
+    return timings, counts
+
+
+def runBenchmark(root, kind, size, columnTypes, form, repeat, sortOn=0,
+                 useDefinitions=False, renderProcesses=0, compact=False,
+                 cssClassesOnCols=False, collateSortKeys=False):
+    """Returns the best phase timings of repeat runs."""
+    container = makeContainer(root, size)
+    definitions = None
+    if useDefinitions or renderProcesses:
+        definitions = getColumnDefinitions(columnTypes)
+    best = {}
+    for i in range(repeat):
+        request = TestRequest(form=dict(form))
+        tbl = makeTable(kind, container, request, columnTypes, sortOn,
+                        definitions, renderProcesses, compact,
+                        cssClassesOnCols, collateSortKeys)
+        timings, counts = timePhases(tbl)
+        for phase, value in timings.items():
+            best[phase] = min(best.get(phase, value), value)
+    del root["container-%s" % size]
+    best["total"] = sum(best[phase] for phase in PHASES)
+    return best, counts
+
+
+def getImportTime(module, repeat):
+    """Returns the best cumulative import time of the module in seconds."""
+    best = None
+    for i in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import " + module],
+            capture_output=True, text=True, check=True,
+        )
+        for line in proc.stderr.splitlines():
+            parts = line.split("|")
+            if len(parts) == 3 and parts[2].strip() == module:
+                duration = int(parts[1]) / 1000000
+                if best is None or duration < best:
+                    best = duration
+    return best
+
+
+def getImportedModules(modules):
+    """Returns the names of all modules a fresh interpreter imports."""
+    code = "import sys\n{}\nprint('\\n'.join(sorted(sys.modules)))".format(
+        "\n".join("import %s" % module for module in modules))
+    proc = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True,
+        check=True,
+    )
+    return proc.stdout.split()
+
+
+def getEagerLazyModules(modules):
+    """Returns the lazy modules which get imported with the modules."""
+    imported = getImportedModules(modules)
+    return [
+        name for name in imported
+        if any(name == lazy or name.startswith(lazy + ".")
+               for lazy in LAZY_MODULES)
+    ]
+
+
+def compare(results, previous):
+    """Returns the report lines comparing results with previous results."""
+    def key(result):
+        return (result["dataset"], result["size"], result["columns"])
+
+    old = {key(result): result for result in previous["results"]}
+    lines = []
+    for result in results["results"]:
+        before = old.get(key(result))
+        if before is None:
+            continue
+        parts = []
+        for phase in PHASES + NESTED_PHASES + ("total",):
+            if before["timings"].get(phase):
+                ratio = result["timings"][phase] / before["timings"][phase]
+                parts.append(f"{phase}={ratio:.2f}")
+        size = before.get("counts", {}).get("renderedBytes")
+        if size:
+            ratio = result["counts"]["renderedBytes"] / size
+            parts.append(f"renderedBytes={ratio:.2f}")
+        lines.append("%s %s %s: %s" % (key(result) + (" ".join(parts),)))
+    before = previous.get("importTimes", {})
+    for module, duration in sorted(results.get("importTimes", {}).items()):
+        if before.get(module):
+            ratio = duration / before[module]
+            lines.append(f"import {module}: {ratio:.2f}")
+    return lines
+
+
+def getParser():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the z3c.table update and render phases."
+    )
+    parser.add_argument(
+        "--sizes",
+        default=DEFAULT_SIZES,
+        help="comma separated dataset sizes (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--datasets",
+        default="container,sequence",
+        help="comma separated datasets (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--columns",
+        default="all",
+        help="comma separated column types or 'all' (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--each-column",
+        action="store_true",
+        help="benchmark each column type in its own table",
+    )
+    parser.add_argument(
+        "--column-definitions",
+        action="store_true",
+        help="bind shared column definitions instead of adding columns",
+    )
+    parser.add_argument(
+        "--render-processes",
+        type=int,
+        default=0,
+        help="render the rows in a process pool, implies "
+        "--column-definitions and needs parallel safe columns like "
+        "getattr and getitem (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="render without whitespace between the elements",
+    )
+    parser.add_argument(
+        "--css-classes-on-cols",
+        action="store_true",
+        help="render the column css classes on col elements",
+    )
+    parser.add_argument(
+        "--collate",
+        action="store_true",
+        help="sort the string sort keys by their collation keys",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=table.Table.batchSize,
+        help="batch size, 0 renders all rows (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--sort-on",
+        default="0",
+        help="sort on column index or id, 'none' disables sorting "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="number of runs, the best run counts (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--import-time",
+        action="store_true",
+        help="measure the import time of the table modules",
+    )
+    parser.add_argument("--output", help="write the JSON results to a file")
+    parser.add_argument("--compare", help="compare with a JSON result file")
+    return parser
+
+
+def main(argv=None):
+    options = getParser().parse_args(argv)
+    sizes = [int(size) for size in options.sizes.split(",") if int(size)]
+    columnTypes = getColumnTypes(options.columns)
+    if options.each_column:
+        scenarios = [(col[0], [col]) for col in columnTypes]
+    else:
+        scenarios = [(options.columns, columnTypes)]
+
+    form = {}
+    if options.batch_size:
+        form["table-batchSize"] = str(options.batch_size)
+    else:
+        form["table-batchSize"] = str(max(sizes, default=0) + 1)
+    sortOn = None
+    if options.sort_on != "none":
+        sortOn = options.sort_on
+
+    results = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "options": vars(options),
+        "results": [],
+    }
+    if options.import_time:
+        results["importTimes"] = {}
+        for module in IMPORT_MODULES:
+            duration = getImportTime(module, options.repeat)
+            results["importTimes"][module] = duration
+            print("import %-24s %.4f" % (module, duration))
+        results["eagerLazyModules"] = getEagerLazyModules(IMPORT_MODULES)
+        for name in results["eagerLazyModules"]:
+            print("lazy module %s got imported" % name)
+    root = setUp()
+    try:
+        for dataset in options.datasets.split(","):
+            for size in sizes:
+                for name, types in scenarios:
+                    timings, counts = runBenchmark(
+                        root, dataset, size, types, form, options.repeat,
+                        sortOn, options.column_definitions,
+                        options.render_processes, options.compact,
+                        options.css_classes_on_cols, options.collate,
+                    )
+                    results["results"].append({
+                        "dataset": dataset,
+                        "size": size,
+                        "columns": name,
+                        "timings": timings,
+                        "counts": counts,
+                    })
+                    print("%-9s %8d %-12s %s" % (
+                        dataset, size, name,
+                        " ".join(f"{phase}={timings[phase]:.4f}"
+                                 for phase in PHASES + ("total",))))
+    finally:
+        tearDown()
+        parallel.shutdown()
+
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if options.compare:
+        with open(options.compare) as f:
+            previous = json.load(f)
+        print("Ratio compared with %s:" % options.compare)
+        for line in compare(results, previous):
+            print(line)
+    return results
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,132 @@
+##############################################################################
+#
+# Copyright (c) 2008 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Locale-aware collation keys
+
+String sort keys get transformed into collation keys once per item, the
+sort compares the precomputed keys. The ICU collator of the language gets
+used if PyICU is installed, otherwise a key ignoring case and accents
+first.
+"""
+__docformat__ = "reStructuredText"
+
+import unicodedata
+
+
+# collation key functions by locale
+collators = {}
+# collation keys by locale and string
+collationKeys = {}
+# names of the locales ICU has collations for
+availableLocales = None
+COLLATORS_SIZE = 100
+COLLATION_CACHE_SIZE = 100000
+
+
+def getFallbackKey(value):
+    """Returns a key comparing base letters, then case folded, then as is."""
+    folded = value.casefold()
+    base = "".join(
+        char for char in unicodedata.normalize("NFKD", folded)
+        if not unicodedata.combining(char)
+    )
+    return (base, folded, value)
+
+
+def getCollationLocale(language):
+    """Returns the name of the collation locale of the language or None.
+
+    ``language`` is a language tag like ``de`` or ``fr-ch``. It maps to the
+    most specific locale ICU has a collation for. Unknown languages and all
+    languages without PyICU map to None, the root collation.
+    """
+    global availableLocales
+    if not language:
+        return None
+    try:
+        import icu
+    except ImportError:
+        return None
+    if availableLocales is None:
+        availableLocales = frozenset(icu.Collator.getAvailableLocales())
+    parts = icu.Locale(language.replace("-", "_")).getName().split("_")
+    while parts:
+        name = "_".join(parts)
+        if name in availableLocales:
+            return name
+        parts.pop()
+    return None
+
+
+def getCollator(locale):
+    """Returns the function computing the collation keys of the locale.
+
+    ``locale`` is a name ``getCollationLocale`` returns, None uses the root
+    collation.
+    """
+    collator = collators.get(locale)
+    if collator is None:
+        try:
+            import icu
+        except ImportError:
+            collator = getFallbackKey
+        else:
+            if locale:
+                icuLocale = icu.Locale(locale)
+            else:
+                icuLocale = icu.Locale.getRoot()
+            collator = icu.Collator.createInstance(icuLocale).getSortKey
+        if len(collators) >= COLLATORS_SIZE:
+            collators.clear()
+        collators[locale] = collator
+    return collator
+
+
+def getCollationKeyGetter(language):
+    """Returns a function transforming sort keys into collation keys.
+
+    Strings, also inside tuples, get transformed, other keys get returned
+    as is. The collation keys get cached per collation locale, without
+    PyICU all languages share the cache of the fallback keys.
+    """
+    locale = getCollationLocale(language)
+    collate = getCollator(locale)
+    cache = collationKeys.get(locale)
+    if cache is None:
+        if len(collationKeys) >= COLLATORS_SIZE:
+            collationKeys.clear()
+        cache = collationKeys[locale] = {}
+
+    def getCollationKey(key):
+        if isinstance(key, str):
+            collationKey = cache.get(key)
+            if collationKey is None:
+                if len(cache) >= COLLATION_CACHE_SIZE:
+                    cache.clear()
+                collationKey = cache[key] = collate(key)
+            return collationKey
+        if isinstance(key, tuple):
+            return tuple(getCollationKey(value) for value in key)
+        return key
+
+    return getCollationKey
+
+
+def collateSortMethod(sortKeyGetter, language):
+    """Returns the sort key getter returning collation keys."""
+    getCollationKey = getCollationKeyGetter(language)
+
+    def getSortKey(row):
+        return getCollationKey(sortKeyGetter(row))
+
+    return getSortKey
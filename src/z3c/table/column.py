@@ -20,10 +20,7 @@ import zope.i18n
 import zope.i18nmessageid
 import zope.interface
 import zope.location
-from zope.dublincore.interfaces import IZopeDublinCore
 from zope.security.interfaces import Unauthorized
-from zope.traversing import api
-from zope.traversing.browser import absoluteURL
 
 from z3c.table import interfaces
 
@@ -67,7 +64,97 @@ def addColumn(
     return column
 
 
+def restoreColumnDefinition(class_, name, settings):
+    """Unpickle a column definition."""
+    return ColumnDefinition(class_, name, **settings)
+
+
+@zope.interface.implementer(interfaces.IColumnDefinition)
+class ColumnDefinition:
+    """Immutable column definition shared by all requests.
+
+    The definition takes the same arguments as ``addColumn`` and creates a
+    column class with the given settings as class attributes once. Calling
+    the definition with context, request and table binds a column instance
+    to the request, so a definition can also get registered as IColumn
+    adapter factory.
+    """
+
+    __slots__ = ("class_", "name", "settings", "factory")
+
+    def __init__(
+        self,
+        class_,
+        name,
+        cellRenderer=None,
+        headCellRenderer=None,
+        colspan=None,
+        weight=None,
+        header=None,
+        cssClasses=None,
+        **kws
+    ):
+        if not interfaces.IColumn.implementedBy(class_):
+            raise ValueError("class_ %s must implement IColumn." % class_)
+        settings = dict(kws)
+        for key, value in (
+            ("cellRenderer", cellRenderer),
+            ("headCellRenderer", headCellRenderer),
+            ("colspan", colspan),
+            ("weight", weight),
+            ("header", header),
+            ("cssClasses", cssClasses),
+        ):
+            if value is not None:
+                settings[key] = value
+        attrs = dict(kws)
+        attrs["__module__"] = class_.__module__
+        attrs["__name__"] = name
+        if cellRenderer is not None:
+            # overload method, the renderer does not get the column
+            attrs["renderCell"] = staticmethod(cellRenderer)
+        if headCellRenderer is not None:
+            attrs["renderHeadCell"] = staticmethod(headCellRenderer)
+        for key in ("colspan", "weight", "header", "cssClasses"):
+            if key in settings:
+                attrs[key] = settings[key]
+        setattr_ = super().__setattr__
+        setattr_("class_", class_)
+        setattr_("name", name)
+        setattr_("settings", settings)
+        setattr_("factory", type(class_.__name__, (class_,), attrs))
+
+    @property
+    def weight(self):
+        return self.factory.weight
+
+    def __call__(self, context, request, table):
+        column = self.factory(context, request, table)
+        column.__parent__ = table
+        return column
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Column definitions are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Column definitions are immutable")
+
+    def __reduce__(self):
+        return (restoreColumnDefinition, (self.class_, self.name,
+                                          self.settings))
+
+    def __repr__(self):
+        return "<{} {} {!r}>".format(
+            self.__class__.__name__, self.class_.__name__, self.name
+        )
+
+
+# zope.traversing and zope.dublincore get imported when a column using them
+# renders its first cell, tables with simple columns don't need them
+
 def getName(item):
+    from zope.traversing import api
+
     # probably not IPhysicallyLocatable but still could have a __name__
     try:
         return api.getName(item)
@@ -75,6 +162,41 @@ def getName(item):
         return item.__name__
 
 
+def getAbsoluteURL(obj, request):
+    from zope.traversing.browser import absoluteURL
+    return absoluteURL(obj, request)
+
+
+def getDublinCore(item):
+    """Returns the IZopeDublinCore adapter of the item or None."""
+    from zope.dublincore.interfaces import IZopeDublinCore
+    return IZopeDublinCore(item, None)
+
+
+def getAnnotations(item):
+    """Returns the attribute annotations of the item as list."""
+    annotations = safeGetAttr(item, "__annotations__", None)
+    if annotations is None:
+        return []
+    return [annotations]
+
+
+def getDublinCoreObjects(item):
+    """Returns the annotations of the item and the dublin core data.
+
+    The dublin core data is only known once the annotations got loaded.
+    """
+    from zope.dublincore.annotatableadapter import DCkey
+    objects = getAnnotations(item)
+    for annotations in list(objects):
+        if getattr(annotations, "_p_changed", 0) is None:
+            continue
+        data = annotations.get(DCkey)
+        if data is not None:
+            objects.append(data)
+    return objects
+
+
 def safeGetAttr(obj, attr, default):
     try:
         return getattr(obj, attr, default)
@@ -95,6 +217,23 @@ class Column(zope.location.Location):
     header = ""
     cssClasses = {}
 
+    # set filterable to True to allow filtering by request parameters and
+    # provide a filterIndex to answer the filter queries from an index
+    filterable = False
+    filterIndex = None
+
+    # name of the ISortIndexer whose persistent sort index of the table
+    # context answers sorting on this column, see z3c.table.sortindex
+    sortIndexName = None
+
+    # set parallelSafe to True if renderCell works with the plain item data
+    # returned by getPlainData, see z3c.table.parallel
+    parallelSafe = False
+
+    # names of the aggregates rendered in the table footer, e.g. ("sum",
+    # "average"), see z3c.table.aggregate
+    aggregates = ()
+
     def __init__(self, context, request, table):
         self.__parent__ = context
         self.context = context
@@ -112,12 +251,82 @@ class Column(zope.location.Location):
         """Returns the sort key used for column sorting."""
         return self.renderCell(item)
 
+    def getPlainData(self, item):
+        """Returns a dict of the plain item values renderCell uses."""
+        return {}
+
+    def getPrefetchObjects(self, item):
+        """Returns the related persistent objects renderCell will load."""
+        return ()
+
+    def getJSONValue(self, item):
+        """Returns the JSON serializable cell value used for row ranges."""
+        return self.renderCell(item)
+
+    def getFilterIndex(self):
+        """Returns the IFilterIndex used for filter queries or None."""
+        return self.filterIndex
+
+    def getFilterValue(self, value):
+        """Returns the filter value converted from the request value.
+
+        The request value is a string. Columns whose filter keys are no
+        strings must convert it, e.g. to an int. A ValueError or TypeError
+        ignores the filter.
+        """
+        return value
+
+    def getFilterKey(self, item):
+        """Returns the value the filter query gets compared with."""
+        return self.getSortKey(item)
+
+    def filterItem(self, item, query):
+        """Returns True if the item matches the filter query.
+
+        Filter keys which can't get compared with the query don't match.
+        """
+        value = self.getFilterKey(item)
+        if isinstance(query, tuple):
+            low, high = query
+            try:
+                if low is not None and value < low:
+                    return False
+                if high is not None and value > high:
+                    return False
+            except TypeError:
+                return False
+            return True
+        return value == query
+
+    def getAggregateValue(self, item):
+        """Returns the value added to the aggregates, None for no value."""
+        return self.getSortKey(item)
+
+    def renderFootCell(self, aggregate, name):
+        """Footer cell content showing the named aggregate."""
+        value = aggregate.getValue(name)
+        if value is None:
+            return ""
+        return html.escape(str(value))
+
+    def getGroupKey(self, item):
+        """Returns the key grouping the rows if the table groups on us."""
+        return self.getSortKey(item)
+
+    def renderGroupHeader(self, key):
+        """Group header content for the group key."""
+        return html.escape(str(key))
+
     def renderHeadCell(self):
         """Header cell content."""
-        header = zope.component.queryMultiAdapter(
-            (self.context, self.request, self.table, self),
-            interfaces.IColumnHeader,
-        )
+        queryColumnHeader = getattr(self.table, "queryColumnHeader", None)
+        if queryColumnHeader is not None:
+            header = queryColumnHeader(self)
+        else:
+            header = zope.component.queryMultiAdapter(
+                (self.context, self.request, self.table, self),
+                interfaces.IColumnHeader,
+            )
         if header:
             header.update()
             # HTML escaping is the responsibility of IColumnHeader.render
@@ -274,6 +483,12 @@ class GetAttrColumn(Column):
 
     attrName = None
     defaultValue = ""
+    parallelSafe = True
+
+    def getPlainData(self, item):
+        if self.attrName is None:
+            return {}
+        return {self.attrName: self.getValue(item)}
 
     def getValue(self, obj):
         if obj is not None and self.attrName is not None:
@@ -289,6 +504,12 @@ class GetItemColumn(Column):
 
     idx = None
     defaultValue = ""
+    parallelSafe = True
+
+    def getPlainData(self, item):
+        if self.idx is None:
+            return {}
+        return {self.idx: self.getValue(item)}
 
     def getValue(self, obj):
         if obj is not None and self.idx is not None:
@@ -347,9 +568,13 @@ class CreatedColumn(FormatterColumn, GetAttrColumn):
     formatterLength = "short"
     attrName = "created"
 
+    def getPrefetchObjects(self, item):
+        # the dublin core data is stored in the annotations
+        return getDublinCoreObjects(item)
+
     def renderCell(self, item):
         formatter = self.getFormatter()
-        dc = IZopeDublinCore(item, None)
+        dc = getDublinCore(item)
         value = self.getValue(dc)
         if value:
             value = formatter.format(value)
@@ -366,9 +591,13 @@ class ModifiedColumn(FormatterColumn, GetAttrColumn):
     formatterLength = "short"
     attrName = "modified"
 
+    def getPrefetchObjects(self, item):
+        # the dublin core data is stored in the annotations
+        return getDublinCoreObjects(item)
+
     def renderCell(self, item):
         formatter = self.getFormatter()
-        dc = IZopeDublinCore(item, None)
+        dc = getDublinCore(item)
         value = self.getValue(dc)
         if value:
             value = formatter.format(value)
@@ -389,8 +618,8 @@ class LinkColumn(Column):
         """Setup link url."""
         if self.linkName is not None:
             return "{}/{}".format(
-                absoluteURL(item, self.request), self.linkName)
-        return absoluteURL(item, self.request)
+                getAbsoluteURL(item, self.request), self.linkName)
+        return getAbsoluteURL(item, self.request)
 
     def getLinkCSS(self, item):
         """Setup link css."""
@@ -462,7 +691,7 @@ class SelectedItemColumn(LinkColumn):
     @property
     def viewURL(self):
         return "{}/{}".format(
-            absoluteURL(self.context, self.request),
+            getAbsoluteURL(self.context, self.request),
             self.table.__name__,
         )
 
@@ -84,6 +84,10 @@ class SortingColumnHeader(ColumnHeader):
                 sortOrder = table.reverseSortOrderNames[0]
 
         args = self.getQueryStringArgs()
+        # tables not based on Table don't know about filters
+        getFilterArgs = getattr(table, "getFilterQueryStringArgs", None)
+        if getFilterArgs is not None:
+            args.update(getFilterArgs())
         args.update(
             {"%s-sortOn" % prefix: colID, "%s-sortOrder" % prefix: sortOrder}
         )
@@ -24,6 +24,21 @@ class IValues(zope.interface.Interface):
     values = zope.interface.Attribute("Iterable table row data sequence.")
 
 
+class ISliceableValues(zope.interface.Interface):
+    """Table values supporting length and slice access.
+
+    Unsorted tables batch sliceable values at the source, only the items of
+    the current batch get resolved.
+    """
+
+    def __len__():
+        """Return the number of values."""
+
+    def __getitem__(idx):
+        """Return the value at an index or a sequence of values for a slice.
+        """
+
+
 class ITable(zope.contentprovider.interfaces.IContentProvider):
     """Table provider"""
 
@@ -43,8 +58,30 @@ class ITable(zope.contentprovider.interfaces.IContentProvider):
 
     rows = zope.interface.Attribute("Sequence of rows")
 
+    columnDefinitions = zope.interface.Attribute(
+        "Sequence of IColumnDefinition bound per request or None"
+    )
+
+    sortedRows = zope.interface.Attribute(
+        "Sequence of all rows in sort order before batching"
+    )
+
+    sortIndex = zope.interface.Attribute(
+        "The ISortIndex the rows got sorted by or None"
+    )
+
+    rowLayouts = zope.interface.Attribute(
+        "Dict of shared row layouts by colspans"
+    )
+
+    staticColspans = zope.interface.Attribute(
+        "Constant colspan of each column, None marks a dynamic colspan"
+    )
+
     selectedItems = zope.interface.Attribute("Sequence of selected items")
 
+    filters = zope.interface.Attribute("Dict of filter queries by column name")
+
     # customize this part if needed
     prefix = zope.schema.BytesLine(
         title=_("Prefix"),
@@ -79,6 +116,255 @@ class ITable(zope.contentprovider.interfaces.IContentProvider):
         required=False,
     )
 
+    collateSortKeys = zope.schema.Bool(
+        title="Collate sort keys",
+        description=("Sort string sort keys by the collation of the "
+                     "request language."),
+        default=False,
+        required=False,
+    )
+
+    groupOn = zope.schema.Tuple(
+        title="Group on",
+        description=("Names of the columns whose group keys group the "
+                     "rows."),
+        value_type=zope.schema.ASCIILine(),
+        default=(),
+        required=False,
+    )
+
+    subtotals = zope.schema.Tuple(
+        title="Subtotals",
+        description=("Names of the aggregates rendered in the subtotal "
+                     "rows ending a group."),
+        value_type=zope.schema.ASCIILine(),
+        default=("sum",),
+        required=False,
+    )
+
+    cssClassGroup = zope.schema.TextLine(
+        title="Group css row class",
+        description=("CSS class for group header rows."),
+        default="group",
+        required=False,
+    )
+
+    cssClassGroupContinued = zope.schema.TextLine(
+        title="Continued group css row class",
+        description=("CSS class for group header rows of a group continued "
+                     "from the previous batch."),
+        default="continued",
+        required=False,
+    )
+
+    cssClassSubtotal = zope.schema.TextLine(
+        title="Subtotal css row class",
+        description=("CSS class for subtotal rows."),
+        default="subtotal",
+        required=False,
+    )
+
+    groups = zope.interface.Attribute(
+        "List of the row groups in their order"
+    )
+
+    deactivateSortedItems = zope.schema.Bool(
+        title="Deactivate sorted items",
+        description=("Deactivate the persistent items activated for "
+                     "sorting which are not part of the current batch."),
+        default=False,
+        required=False,
+    )
+
+    activatedItems = zope.interface.Attribute(
+        "Number of persistent items activated for sorting"
+    )
+
+    sortGhosts = zope.interface.Attribute(
+        "Sequence of the items which were ghosts before sorting or None"
+    )
+
+    prefetchItems = zope.schema.Bool(
+        title="Prefetch items",
+        description=("Prefetch the persistent items of the batch and the "
+                     "objects the columns touch before rendering."),
+        default=False,
+        required=False,
+    )
+
+    prefetchDepth = zope.schema.Int(
+        title="Prefetch depth",
+        description=("Rounds of prefetching the objects the columns return "
+                     "for the loaded objects of the round before."),
+        default=2,
+        required=False,
+    )
+
+    cacheHead = zope.schema.Bool(
+        title="Cache head",
+        description=("Cache the rendered thead by the key getHeadCacheKey "
+                     "returns."),
+        default=False,
+        required=False,
+    )
+
+    streamRows = zope.schema.Bool(
+        title="Stream rows",
+        description=("Consume the values of unsorted tables in one pass "
+                     "and only keep the rows of the current batch."),
+        default=False,
+        required=False,
+    )
+
+    renderProcesses = zope.schema.Int(
+        title="Render processes",
+        description=("Number of processes rendering the rows of large "
+                     "tables, 0 renders the rows in the request thread."),
+        default=0,
+        required=False,
+    )
+
+    compact = zope.schema.Bool(
+        title="Compact",
+        description=("Render the table without whitespace between the "
+                     "elements."),
+        default=False,
+        required=False,
+    )
+
+    cssClassesOnCols = zope.schema.Bool(
+        title="CSS classes on cols",
+        description=("Set the td and sorting css classes of the columns on "
+                     "col elements instead of every cell."),
+        default=False,
+        required=False,
+    )
+
+    maxBatchSize = zope.schema.Int(
+        title="Max batch size",
+        description=("Upper limit of the batch size, None for no limit."),
+        default=None,
+        required=False,
+    )
+
+    maxRows = zope.schema.Int(
+        title="Max rows",
+        description=("Maximum number of rows getting rendered, None for no "
+                     "limit."),
+        default=None,
+        required=False,
+    )
+
+    maxCells = zope.schema.Int(
+        title="Max cells",
+        description=("Maximum number of cells getting rendered, None for "
+                     "no limit."),
+        default=None,
+        required=False,
+    )
+
+    maxRenderTime = zope.schema.Float(
+        title="Max render time",
+        description=("Seconds from the start of update after which "
+                     "setting up, sorting and rendering the rows stops, "
+                     "None for no limit."),
+        default=None,
+        required=False,
+    )
+
+    deadlineHeader = zope.schema.TextLine(
+        title="Deadline header",
+        description=("Request header giving the seconds left for the "
+                     "response, None for not reading a deadline from the "
+                     "request."),
+        default=None,
+        required=False,
+    )
+
+    budgetExceeded = zope.interface.Attribute(
+        "Name of the exceeded budget limit or None"
+    )
+
+    incomplete = zope.interface.Attribute(
+        "True if not all rows of the batch got rendered"
+    )
+
+    deadline = zope.interface.Attribute(
+        "Timer value after which setting up, sorting and rendering the rows "
+        "stops or None"
+    )
+
+    deadlineName = zope.interface.Attribute(
+        "Name of the limit the deadline comes from or None"
+    )
+
+    renderBufferSize = zope.schema.Int(
+        title="Render buffer size",
+        description=("Size of the chunks renderTo writes in bytes."),
+        default=65536,
+        required=False,
+    )
+
+    renderChunkSize = zope.schema.Int(
+        title="Render chunk size",
+        description=("Number of rows rendered by a process at once."),
+        default=2000,
+        required=False,
+    )
+
+    conditionalGet = zope.schema.Bool(
+        title="Conditional GET",
+        description=("Answer conditional GET requests in update."),
+        default=False,
+        required=False,
+    )
+
+    collectStats = zope.schema.Bool(
+        title="Collect statistics",
+        description=("Collect phase durations and counts in update and "
+                     "render."),
+        default=False,
+        required=False,
+    )
+
+    collectColumnStats = zope.schema.Bool(
+        title="Collect column statistics",
+        description=("Collect the time spent in each column for rendering "
+                     "cells and getting sort keys."),
+        default=False,
+        required=False,
+    )
+
+    slowRenderThreshold = zope.schema.Float(
+        title="Slow render threshold",
+        description=("Log the column statistics if update and render took "
+                     "longer than this amount of seconds."),
+        default=None,
+        required=False,
+    )
+
+    columnStatsComment = zope.schema.Bool(
+        title="Column statistics comment",
+        description=("Add the column statistics as HTML comment."),
+        default=False,
+        required=False,
+    )
+
+    stats = zope.interface.Attribute(
+        "The ITableStats of the last update or None"
+    )
+
+    notModified = zope.interface.Attribute(
+        "True if update answered the request with 304 Not Modified"
+    )
+
+    rowKeyAttribute = zope.schema.ASCIILine(
+        title="Row key attribute",
+        description=("Row attribute name used for rendering the row key."),
+        default=None,
+        required=False,
+    )
+
     # sort attributes
     sortOn = zope.schema.Int(
         title=_("Sort on table index"),
@@ -127,6 +413,9 @@ class ITable(zope.contentprovider.interfaces.IContentProvider):
     def getCSSClass(element, cssClass=None):
         """Return the css class if any or an empty string."""
 
+    def measure(phase):
+        """Return a context manager adding its duration to the phase."""
+
     def setUpColumns():
         """Setup table column renderer."""
 
@@ -139,12 +428,54 @@ class ITable(zope.contentprovider.interfaces.IContentProvider):
     def orderColumns():
         """Order columns."""
 
+    def setUpRowWindow(values):
+        """Return the rows of the current batch consuming values once."""
+
+    def prefetchRows():
+        """Prefetch the persistent items of the rows in bulk."""
+
+    def deactivateGhosts():
+        """Deactivate the items activated for sorting only."""
+
+    def getSortIndex():
+        """Return the sort index answering the current sorting or None."""
+
+    def bindColumns():
+        """Bind the column definitions to the request in their order."""
+
+    def getColspans(item):
+        """Return the colspan of each column, None marks a spanned cell."""
+
+    def getStaticColspans():
+        """Return the constant colspan of each column, None if dynamic."""
+
+    def getRowLayout(colspans):
+        """Return the shared row layout for the given colspans."""
+
     def setUpRow(item):
         """Setup table row."""
 
     def setUpRows():
         """Setup table rows."""
 
+    def getFilters():
+        """Return the filter queries from the request by column name."""
+
+    def getFilterQueryStringArgs():
+        """Return the request arguments of the active filters."""
+
+    def getFilterArg(key):
+        """Return the string filter argument of the request or None."""
+
+    def hasContainerValues():
+        """Return True if the values are all values of the container."""
+
+    def getFilterItems(keys):
+        """Return the items for the keys a filter index returned."""
+
+    def filterValues():
+        """Return the values matching the current filters."""
+
     def getSortOn():
         """Return sort on column id."""
 
@@ -154,6 +485,9 @@ class ITable(zope.contentprovider.interfaces.IContentProvider):
     def sortRows():
         """Sort rows."""
 
+    def getCollationLanguage():
+        """Return the language collating the sort keys or None."""
+
     def getBatchSize():
         """Return the batch size."""
 
@@ -163,12 +497,51 @@ class ITable(zope.contentprovider.interfaces.IContentProvider):
     def batchRows():
         """Batch rows."""
 
+    def getItemStamp(item):
+        """Return a modification stamp of the item or None if unknown."""
+
+    def getContainerStamp():
+        """Return a stamp which changes if items get added or removed."""
+
+    def getGeneration():
+        """Return a stamp which changes with any change of the values."""
+
+    def getValidatorStamps():
+        """Return the number of items and the relevant item stamps."""
+
+    def getValidators():
+        """Return the ETag and the last modification date or None."""
+
+    def isNotModified(etag, lastModified):
+        """Return True if the client already has the current version."""
+
+    def handleConditionalGet():
+        """Set the validator headers and return True if not modified."""
+
+    def getRowKey(row, position=None):
+        """Return a stable key for the row."""
+
+    def getRowKeys(rows, start=0):
+        """Return the unique keys of the rows starting at position start."""
+
+    def getBatchRowKeys():
+        """Return the unique keys of the current batch rows by row id."""
+
+    def getRowVersion(row):
+        """Return a version of the row item or None."""
+
     def isSelectedRow(row):
         """Return `True for selected row."""
 
     def renderTable():
         """Render the table."""
 
+    def getIndents():
+        """Return the whitespace put before the elements by nesting level."""
+
+    def renderColGroup():
+        """Render the colgroup if the css classes are set on the columns."""
+
     def renderHead():
         """Render the thead."""
 
@@ -178,6 +551,12 @@ class ITable(zope.contentprovider.interfaces.IContentProvider):
     def renderHeadCell(column):
         """Setup the table header rows."""
 
+    def getHeadCacheKey():
+        """Return the key of the rendered thead or None if not cacheable."""
+
+    def queryColumnHeader(column):
+        """Return the IColumnHeader of the column or None."""
+
     def renderBody():
         """Render the table body."""
 
@@ -187,9 +566,103 @@ class ITable(zope.contentprovider.interfaces.IContentProvider):
     def renderRow(row, cssClass=None):
         """Render the table body rows."""
 
+    def renderRowsDiff(hashes):
+        """Render the rows which differ from the given row hashes."""
+
+    def getRowRangeArgs():
+        """Return the row range start and end from the request."""
+
+    def getRowRange(start=None, end=None):
+        """Return the column metadata and cell values of a row range."""
+
+    def renderJSON(start=None, end=None):
+        """Render a row range as compact JSON."""
+
+    def canRenderParallel():
+        """Return True if the rows can get rendered in a process pool."""
+
+    def renderRowStart(row, cssClass=None):
+        """Render the opening tr tag of the row."""
+
+    def renderRowEnd():
+        """Render the closing tr tag."""
+
+    def renderCellStart(item, column, colspan=0):
+        """Render the opening td tag of the cell."""
+
     def renderCell(item, column, colspan=0):
         """Render a single table body cell."""
 
+    def addRenderCounts(counter):
+        """Add the number of the first counter rendered rows and cells."""
+
+    def getRowLimits():
+        """Return the (name, number of rows) pairs of the budget limits."""
+
+    def applyBudget():
+        """Clamp the batch size to the row limits of the budget."""
+
+    def getDeadlines():
+        """Return the (name, timer value) pairs of the deadlines."""
+
+    def iterBeforeDeadline(iterable):
+        """Iterate the values until the deadline passes."""
+
+    aggregates = zope.interface.Attribute(
+        "Dict of the IAggregate of the columns with aggregates by name"
+    )
+
+    def setUpAggregates():
+        """Return the empty aggregates of the columns by name."""
+
+    def aggregateValues(values):
+        """Iterate the values adding them to the column aggregates."""
+
+    def renderFoot():
+        """Render the tfoot with the column aggregates."""
+
+    def renderFootRow(name):
+        """Render the footer row of the named aggregate."""
+
+    def renderAggregateRow(aggregates, name, cssClass=None):
+        """Render a row with the named aggregate of each column."""
+
+    def groupRows():
+        """Order the sorted rows by group and set up the groups."""
+
+    def renderGroupHeaderRow(group, continued=False):
+        """Render the row starting a group."""
+
+    def renderSubtotalRows(group):
+        """Render the subtotal rows ending a group."""
+
+    def renderGroupRows(row, current):
+        """Return the group rows before the row and the row group."""
+
+    def isPastDeadline():
+        """Return True and mark the table incomplete if time is up."""
+
+    def renderIncompleteRow():
+        """Render the row marking the rows as incomplete."""
+
+    def canWriteCells():
+        """Return True if the rows can get written cell by cell."""
+
+    def writeRows(buffer, flush):
+        """Append the encoded rows to the buffer."""
+
+    def writeTable(writer):
+        """Write the encoded table to the writer."""
+
+    def renderTo(writer):
+        """Write the UTF-8 encoded table to a file like writer."""
+
+    def renderColumnStats():
+        """Render the column statistics as HTML comment."""
+
+    def reportColumnStats():
+        """Log the column statistics if the table was slow."""
+
     def render():
         """Plain render method without keyword arguments."""
 
@@ -245,6 +718,73 @@ class IColumn(zope.interface.Interface):
         """Render the column content."""
 
 
+class IColumnDefinition(zope.interface.Interface):
+    """Immutable column definition shared by all requests."""
+
+    name = zope.interface.Attribute("The column name")
+
+    factory = zope.interface.Attribute(
+        "The IColumn class carrying the column settings"
+    )
+
+    settings = zope.interface.Attribute(
+        "Dict of the settings given to the definition"
+    )
+
+    weight = zope.interface.Attribute("The column weight")
+
+    def __call__(context, request, table):
+        """Return a new column bound to the request."""
+
+
+class ISortIndexer(zope.interface.Interface):
+    """Named utility computing the sort keys of a sort index.
+
+    The sort keys of all items must be comparable with each other.
+    """
+
+    def getSortKey(item):
+        """Return the sort key of the item."""
+
+
+class ISortIndex(zope.interface.Interface):
+    """Item names of a container ordered by their sort key."""
+
+    def __len__():
+        """Return the number of indexed items."""
+
+    def index(name, key):
+        """Index or reindex the item name with the sort key.
+
+        None sorts after all other keys. Items whose key can't get compared
+        with the indexed keys are left out.
+        """
+
+    def unindex(name):
+        """Remove the item name from the index."""
+
+    def clear():
+        """Remove all item names."""
+
+    def getNames(start, stop, reverse=False):
+        """Return the item names from start to stop in sort order."""
+
+
+class IFilterIndex(zope.interface.Interface):
+    """Index a column can push its filter queries down to.
+
+    The API follows ``zope.index.interfaces.IIndexSearch`` but the result
+    contains the keys the table uses for looking up the items in its context.
+    """
+
+    def apply(query):
+        """Return the keys of the items matching the query.
+
+        The query is a single value for equality filters or a
+        ``(min, max)`` tuple for range filters where None means unbounded.
+        """
+
+
 class INoneCell(IColumn):
     """None cell used for colspan."""
 
@@ -259,6 +799,73 @@ class IBatchProvider(zope.contentprovider.interfaces.IContentProvider):
         """Plain render method without keyword arguments."""
 
 
+class IAggregate(zope.interface.Interface):
+    """Aggregates of the values of a column."""
+
+    names = zope.interface.Attribute(
+        "The names of the aggregates the column renders"
+    )
+
+    count = zope.interface.Attribute("Number of the added values")
+
+    sum = zope.interface.Attribute("Sum of the added values")
+
+    average = zope.interface.Attribute("Average of the added values or None")
+
+    min = zope.interface.Attribute("Smallest added value or None")
+
+    max = zope.interface.Attribute("Largest added value or None")
+
+    def add(value):
+        """Add the value, None gets ignored."""
+
+    def getValue(name):
+        """Return the value of the named aggregate."""
+
+
+class ITableStats(zope.interface.Interface):
+    """Phase durations and counts of one table update and render."""
+
+    durations = zope.interface.Attribute(
+        "Dict of durations in seconds by phase name"
+    )
+
+    counts = zope.interface.Attribute("Dict of counts by name")
+
+    columns = zope.interface.Attribute(
+        "Dict of column statistics by column name"
+    )
+
+    def phase(name):
+        """Return a context manager adding its duration to the phase."""
+
+    def timeIterable(name, iterable):
+        """Return an iterator adding the time spent in next to the phase."""
+
+    def addTime(name, duration):
+        """Add the duration to the phase."""
+
+    def addCount(name, count=1):
+        """Add the count to the named counter."""
+
+    def addColumnTime(name, method, duration):
+        """Add the duration of a column method call to the column."""
+
+    def elapsed():
+        """Return the seconds since the statistics got created."""
+
+    def getColumnReport():
+        """Return the column statistics lines, the slowest column first."""
+
+
+class ITableStatsEvent(zope.interface.Interface):
+    """A table collecting statistics got rendered."""
+
+    table = zope.interface.Attribute("The table")
+
+    stats = zope.interface.Attribute("The ITableStats of the table")
+
+
 class IColumnHeader(zope.interface.Interface):
     """Multi-adapter for header rendering."""
 
@@ -0,0 +1,179 @@
+##############################################################################
+#
+# Copyright (c) 2008 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Parallel row rendering
+
+Renders the rows of large tables in a process pool. The workers get the
+picklable column definitions, the opening row and cell tags and plain item
+data extracted by the columns. The rendered chunks get joined in order.
+"""
+__docformat__ = "reStructuredText"
+
+import concurrent.futures
+import logging
+import multiprocessing
+import pickle
+
+from z3c.table import interfaces
+
+
+logger = logging.getLogger("z3c.table")
+
+# process pools by number of processes
+executors = {}
+
+
+class PlainItem:
+    """Plain item data offering the values as attributes and items."""
+
+    def __init__(self, data=()):
+        self.__dict__.update(data)
+
+    def __getitem__(self, key):
+        return self.__dict__[key]
+
+
+def getDefiningClass(cls, name):
+    for base in cls.__mro__:
+        if name in base.__dict__:
+            return base
+    return None
+
+
+def isParallelSafe(column):
+    """Returns True if the column can render plain item data.
+
+    The ``parallelSafe`` flag only counts if it is set on the class defining
+    ``renderCell`` or on a subclass of it. A subclass overriding
+    ``renderCell`` has to set the flag again.
+    """
+    if not getattr(column, "parallelSafe", False):
+        return False
+    if "renderCell" in column.__dict__:
+        return False
+    cls = type(column)
+    mro = cls.__mro__
+    owner = getDefiningClass(cls, "parallelSafe")
+    renderer = getDefiningClass(cls, "renderCell")
+    return mro.index(owner) <= mro.index(renderer)
+
+
+def getExecutor(processes):
+    """Returns the shared process pool for the number of processes."""
+    executor = executors.get(processes)
+    if executor is None:
+        # spawn instead of fork, forking a threaded server is not safe
+        executor = executors[processes] = (
+            concurrent.futures.ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        )
+    return executor
+
+
+def shutdown():
+    """Shuts down the process pools."""
+    while executors:
+        processes, executor = executors.popitem()
+        executor.shutdown()
+
+
+def renderChunk(definitions, layouts, chunk, rowEnd):
+    """Renders a chunk of rows in a worker process."""
+    columns = [definition(None, None, None) for definition in definitions]
+    layouts = [
+        [(columns[idx].renderCell, start) for idx, start in layout]
+        for layout in layouts
+    ]
+    parts = []
+    append = parts.append
+    for rowStart, layoutIdx, item in chunk:
+        append(rowStart)
+        for renderCell, start in layouts[layoutIdx]:
+            append(start)
+            append(str(renderCell(item)))
+            append("</td>")
+        append(rowEnd)
+    return "".join(parts)
+
+
+def getChunks(table):
+    """Returns the layouts and the row chunks of the table."""
+    columnIdx = {id(col): idx for idx, col in enumerate(table.columns)}
+    layoutIdx = {}
+    layouts = []
+    chunks = []
+    chunk = []
+    cssClasses = (table.cssClassEven, table.cssClassOdd)
+    # without row keys the opening row tag only depends on the row parity
+    # and the selection
+    rowStarts = {}
+    getPlainData = [col.getPlainData for col in table.columns]
+    for counter, row in enumerate(table.rows):
+        idx = layoutIdx.get(id(row.layout))
+        if idx is None:
+            idx = layoutIdx[id(row.layout)] = len(layouts)
+            layouts.append(tuple(
+                (columnIdx[id(col)], table.renderCellStart(None, col, colspan))
+                for col, colspan in row.layout
+                if not interfaces.INoneCell.providedBy(col)
+            ))
+        item = PlainItem()
+        for getData in getPlainData:
+            item.__dict__.update(getData(row.item))
+        cssClass = cssClasses[counter % 2]
+        if table.rowKeyAttribute:
+            rowStart = table.renderRowStart(row, cssClass)
+        else:
+            key = (cssClass, table.isSelectedRow(row))
+            rowStart = rowStarts.get(key)
+            if rowStart is None:
+                rowStart = rowStarts[key] = table.renderRowStart(
+                    row, cssClass)
+        chunk.append((rowStart, idx, item))
+        if len(chunk) >= table.renderChunkSize:
+            chunks.append(chunk)
+            chunk = []
+    if chunk:
+        chunks.append(chunk)
+    return layouts, chunks
+
+
+def renderRows(table):
+    """Renders the table rows in the process pool.
+
+    Returns None if the column definitions can not get pickled or the
+    process pool broke, the table renders the rows itself then.
+    """
+    definitions = {d.name: d for d in table.columnDefinitions}
+    definitions = [definitions[col.__name__] for col in table.columns]
+    try:
+        pickle.dumps(definitions)
+    except Exception as e:
+        logger.warning("Column definitions can not get pickled: %s", e)
+        return None
+    layouts, chunks = getChunks(table)
+    executor = getExecutor(table.renderProcesses)
+    try:
+        futures = [
+            executor.submit(
+                renderChunk, definitions, layouts, chunk, table.renderRowEnd()
+            )
+            for chunk in chunks
+        ]
+        return "".join(future.result() for future in futures)
+    except concurrent.futures.process.BrokenProcessPool as e:
+        logger.warning("Process pool broke, rendering serial: %s", e)
+        executors.pop(table.renderProcesses, None)
+        return None
@@ -0,0 +1,269 @@
+##############################################################################
+#
+# Copyright (c) 2008 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Persistent sort indexes
+
+A sort index keeps the item names of a container ordered by the sort key of
+a named ``ISortIndexer`` utility. The indexes get stored in the container
+annotations and are maintained by object event subscribers. A table sorting
+on a column with a ``sortIndexName`` reads its batch straight from the
+index.
+"""
+__docformat__ = "reStructuredText"
+
+import argparse
+import sys
+
+import persistent
+import zope.component
+import zope.interface
+from BTrees.Length import Length
+from BTrees.OOBTree import OOBTree
+from zope.annotation.interfaces import IAnnotations
+
+from z3c.table import interfaces
+from z3c.table import value
+
+
+SORT_INDEXES_KEY = "z3c.table.sortindex"
+
+
+@zope.interface.implementer(interfaces.ISortIndexer)
+class AttributeSortIndexer:
+    """Sort indexer using an item attribute as sort key."""
+
+    def __init__(self, attrName):
+        self.attrName = attrName
+
+    def getSortKey(self, item):
+        return getattr(item, self.attrName, None)
+
+
+@zope.interface.implementer(interfaces.ISortIndex)
+class SortIndex(persistent.Persistent):
+    """Item names ordered by their sort key."""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        # ((is None, sort key), name) -> None and name -> (is None, sort key)
+        self._fwd = OOBTree()
+        self._rev = OOBTree()
+        self._length = Length()
+
+    def __len__(self):
+        return self._length()
+
+    def index(self, name, key):
+        # None sorts after all other keys
+        key = (key is None, key)
+        old = self._rev.get(name, self)
+        if old is not self:
+            if old == key:
+                return
+            self.unindex(name)
+        try:
+            self._fwd[(key, name)] = None
+        except TypeError:
+            # keys not comparable with the indexed ones are left out, the
+            # index then does not answer the sorting anymore
+            return
+        self._rev[name] = key
+        self._length.change(1)
+
+    def unindex(self, name):
+        old = self._rev.get(name, self)
+        if old is self:
+            return
+        del self._rev[name]
+        del self._fwd[(old, name)]
+        self._length.change(-1)
+
+    def getNames(self, start, stop, reverse=False):
+        length = len(self)
+        start = min(max(start, 0), length)
+        stop = min(max(stop, start), length)
+        if reverse:
+            start, stop = length - stop, length - start
+        names = [name for key, name in self._fwd.keys()[start:stop]]
+        if reverse:
+            names.reverse()
+        return names
+
+
+def querySortIndexes(container):
+    """Returns the sort indexes of the container by name or None."""
+    annotations = IAnnotations(container, None)
+    if annotations is None:
+        return None
+    return annotations.get(SORT_INDEXES_KEY)
+
+
+def querySortIndex(container, name):
+    """Returns the named sort index of the container or None."""
+    indexes = querySortIndexes(container)
+    if indexes is None:
+        return None
+    return indexes.get(name)
+
+
+def rebuildSortIndex(container, name):
+    """Creates or rebuilds the named sort index of the container."""
+    indexer = zope.component.getUtility(interfaces.ISortIndexer, name=name)
+    annotations = IAnnotations(container)
+    indexes = annotations.get(SORT_INDEXES_KEY)
+    if indexes is None:
+        indexes = annotations[SORT_INDEXES_KEY] = OOBTree()
+    index = indexes.get(name)
+    if index is None:
+        index = indexes[name] = SortIndex()
+    else:
+        index.clear()
+    for itemName, item in container.items():
+        index.index(itemName, indexer.getSortKey(item))
+    return index
+
+
+def removeSortIndex(container, name):
+    """Removes the named sort index of the container."""
+    indexes = querySortIndexes(container)
+    if indexes is not None and name in indexes:
+        del indexes[name]
+
+
+def indexItem(container, name, item):
+    indexes = querySortIndexes(container)
+    if not indexes:
+        return
+    for indexName, index in indexes.items():
+        indexer = zope.component.queryUtility(
+            interfaces.ISortIndexer, name=indexName
+        )
+        if indexer is not None:
+            index.index(name, indexer.getSortKey(item))
+
+
+def unindexItem(container, name):
+    indexes = querySortIndexes(container)
+    if not indexes:
+        return
+    for index in indexes.values():
+        index.unindex(name)
+
+
+def objectMovedSubscriber(item, event):
+    """Updates the sort indexes if an item got added, removed or renamed."""
+    if event.object is not item:
+        # the event got dispatched to a sublocation of the moved item
+        return
+    if event.oldParent is not None:
+        unindexItem(event.oldParent, event.oldName)
+    if event.newParent is not None:
+        indexItem(event.newParent, event.newName, item)
+
+
+def objectModifiedSubscriber(item, event):
+    """Updates the sort indexes of the item container."""
+    container = getattr(item, "__parent__", None)
+    name = getattr(item, "__name__", None)
+    if container is not None and name is not None:
+        indexItem(container, name, item)
+
+
+class LazyRows(value.SlicedRows):
+    """Rows of a sort index slice.
+
+    Only the items of the requested slice get loaded and set up, which
+    allows to batch the rows without touching all items.
+    """
+
+    def __init__(self, table, index, reverse=False):
+        super().__init__(table, None)
+        self.index = index
+        self.reverse = reverse
+
+    def __len__(self):
+        return len(self.index)
+
+    def getItems(self, start, stop):
+        context = self.table.context
+        items = []
+        for name in self.index.getNames(start, stop, self.reverse):
+            try:
+                items.append(context[name])
+            except KeyError:
+                # skip names of a stale index
+                continue
+        return items
+
+
+def getParser():
+    parser = argparse.ArgumentParser(
+        description="Rebuild the z3c.table sort indexes of a container."
+    )
+    parser.add_argument("file", help="the ZODB FileStorage file")
+    parser.add_argument(
+        "path", help="slash separated path of the container below the root"
+    )
+    parser.add_argument(
+        "--index",
+        action="append",
+        required=True,
+        help="sort indexer name, can be given more than once",
+    )
+    parser.add_argument(
+        "--zcml",
+        help="ZCML file registering the sort indexers",
+    )
+    parser.add_argument(
+        "--root-name",
+        default="Application",
+        help="name of the root folder in the ZODB root (default: "
+        "%(default)s)",
+    )
+    return parser
+
+
+def main(argv=None):
+    """Rebuilds sort indexes in a ZODB FileStorage.
+
+    Requires the ``sortindex`` extra.
+    """
+    try:
+        import ZODB
+        import ZODB.FileStorage
+        from zope.configuration import xmlconfig
+    except ImportError as e:
+        sys.exit(f"The command requires the sortindex extra, install "
+                 f"z3c.table[sortindex]: {e}")
+
+    options = getParser().parse_args(argv)
+    if options.zcml:
+        xmlconfig.file(options.zcml)
+    db = ZODB.DB(ZODB.FileStorage.FileStorage(options.file))
+    try:
+        with db.transaction() as conn:
+            container = conn.root()[options.root_name]
+            for name in options.path.strip("/").split("/"):
+                if name:
+                    container = container[name]
+            for name in options.index:
+                index = rebuildSortIndex(container, name)
+                print(f"Rebuilt sort index {name} with {len(index)} items")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
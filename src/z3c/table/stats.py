@@ -0,0 +1,150 @@
+##############################################################################
+#
+# Copyright (c) 2008 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Table statistics
+"""
+__docformat__ = "reStructuredText"
+
+import time
+
+import zope.interface
+
+from z3c.table import interfaces
+
+
+timer = time.perf_counter
+
+
+class NullPhase:
+    """Phase timer used if no statistics get collected."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+nullPhase = NullPhase()
+
+
+class Phase:
+    """Adds the time spent in a with block to the phase duration."""
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.start = timer()
+        return self
+
+    def __exit__(self, *args):
+        self.stats.addTime(self.name, timer() - self.start)
+
+
+class TimedIterator:
+    """Adds the time spent for getting the next value to the phase."""
+
+    def __init__(self, stats, name, iterable):
+        self.stats = stats
+        self.name = name
+        self.iterator = iter(iterable)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = timer()
+        try:
+            return next(self.iterator)
+        finally:
+            self.stats.addTime(self.name, timer() - start)
+
+
+class ColumnStats:
+    """Total time, call count and max time per column method."""
+
+    def __init__(self, name):
+        self.name = name
+        self.total = 0.0
+        self.methods = {}
+
+    def add(self, method, duration):
+        self.total += duration
+        total, calls, maximum = self.methods.get(method, (0.0, 0, 0.0))
+        self.methods[method] = (
+            total + duration, calls + 1, max(maximum, duration)
+        )
+
+    def __repr__(self):
+        return "{} {}".format(self.name, ", ".join(
+            f"{method} total={total:.6f}s calls={calls} max={maximum:.6f}s"
+            for method, (total, calls, maximum) in sorted(
+                self.methods.items())
+        ))
+
+
+@zope.interface.implementer(interfaces.ITableStats)
+class TableStats:
+    """Phase durations and counts of one table update and render."""
+
+    def __init__(self):
+        self.started = timer()
+        self.durations = {}
+        self.counts = {}
+        self.columns = {}
+
+    def phase(self, name):
+        return Phase(self, name)
+
+    def timeIterable(self, name, iterable):
+        return TimedIterator(self, name, iterable)
+
+    def addTime(self, name, duration):
+        self.durations[name] = self.durations.get(name, 0.0) + duration
+
+    def addCount(self, name, count=1):
+        self.counts[name] = self.counts.get(name, 0) + count
+
+    def addColumnTime(self, name, method, duration):
+        columnStats = self.columns.get(name)
+        if columnStats is None:
+            columnStats = self.columns[name] = ColumnStats(name)
+        columnStats.add(method, duration)
+
+    def elapsed(self):
+        return timer() - self.started
+
+    def getColumnReport(self):
+        """Returns the column statistics lines, the slowest column first."""
+        columns = sorted(
+            self.columns.values(), key=lambda col: col.total, reverse=True
+        )
+        return [repr(col) for col in columns]
+
+    def __repr__(self):
+        return "<{} {}>".format(
+            self.__class__.__name__,
+            " ".join(f"{name}={value:.6f}"
+                     for name, value in sorted(self.durations.items())),
+        )
+
+
+@zope.interface.implementer(interfaces.ITableStatsEvent)
+class TableStatsEvent:
+    """Notified after a table collecting statistics got rendered."""
+
+    def __init__(self, table, stats):
+        self.table = table
+        self.stats = stats
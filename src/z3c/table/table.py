@@ -11,16 +11,46 @@
 # FOR A PARTICULAR PURPOSE.
 #
 ##############################################################################
-from xml.sax.saxutils import quoteattr
+import datetime
+import hashlib
+import html
+import itertools
+import json
+import logging
+import weakref
+from collections import deque
 
 import zope.component
+import zope.event
+import zope.i18n
 import zope.interface
 import zope.location
-from z3c.batching.batch import Batch
-from z3c.batching.interfaces import IBatch
+from zope.i18n.interfaces import IUserPreferredLanguages
 
+from z3c.table import aggregate
 from z3c.table import column
 from z3c.table import interfaces
+from z3c.table import stats
+from z3c.table import value
+from z3c.table.i18n import _
+
+
+logger = logging.getLogger("z3c.table")
+
+
+def quoteattr(value):
+    """Returns the escaped and quoted attribute value.
+
+    Works like ``xml.sax.saxutils.quoteattr`` which imports ``urllib``.
+    """
+    value = (value.replace("&", "&amp;").replace("<", "&lt;")
+             .replace(">", "&gt;").replace("\n", "&#10;")
+             .replace("\r", "&#13;").replace("\t", "&#9;"))
+    if '"' not in value:
+        return '"%s"' % value
+    if "'" not in value:
+        return "'%s'" % value
+    return '"%s"' % value.replace('"', "&quot;")
 
 
 def getWeight(column):
@@ -30,6 +60,80 @@ def getWeight(column):
         return 0
 
 
+# header factories by adapter registry, see queryColumnHeader
+headerFactoryCaches = weakref.WeakKeyDictionary()
+HEADER_FACTORY_CACHE_SIZE = 1000
+
+
+def getHeaderFactoryCache(adapters):
+    """Returns the header factories cached for the adapter registry.
+
+    The cache gets cleared if the registry or one of its bases changes,
+    which is told by their generations. Registries without generations
+    don't get cached.
+    """
+    generation = tuple(
+        getattr(registry, "_generation", None)
+        for registry in getattr(adapters, "ro", (adapters,))
+    )
+    if None in generation:
+        return {}
+    cache = headerFactoryCaches.get(adapters)
+    if (cache is None or cache[0] != generation
+            or len(cache[1]) >= HEADER_FACTORY_CACHE_SIZE):
+        cache = headerFactoryCaches[adapters] = (generation, {})
+    return cache[1]
+
+
+# ordered column definitions and column ids by definitions and prefix
+definitionOrders = {}
+DEFINITION_ORDERS_SIZE = 100
+
+
+def getDefinitionOrder(definitions, prefix):
+    """Returns the ordered column definitions and their column ids."""
+    key = (definitions, prefix)
+    order = definitionOrders.get(key)
+    if order is None:
+        ordered = tuple(sorted(definitions, key=getWeight))
+        ids = tuple(
+            f"{prefix}-{definition.name}-{idx}"
+            for idx, definition in enumerate(ordered)
+        )
+        if len(definitionOrders) >= DEFINITION_ORDERS_SIZE:
+            definitionOrders.clear()
+        order = definitionOrders[key] = (ordered, ids)
+    return order
+
+
+# whitespace put before the elements by nesting level
+INDENTS = ("\n", "\n  ", "\n    ", "\n      ")
+COMPACT_INDENTS = ("", "", "", "")
+
+# rendered thead by head cache key
+headCache = {}
+HEAD_CACHE_SIZE = 1000
+
+
+def getPreferredLanguages(request):
+    """Returns the preferred languages of the request as tuple or None."""
+    languages = IUserPreferredLanguages(request, None)
+    if languages is None:
+        return None
+    return tuple(languages.getPreferredLanguages())
+
+
+def getCSSKey(cssClasses):
+    return tuple(sorted(cssClasses.items()))
+
+
+def getCacheValue(value):
+    """Returns the value for a cache key, lists become tuples."""
+    if isinstance(value, list):
+        return tuple(getCacheValue(item) for item in value)
+    return value
+
+
 def getSortMethod(idx):
     def getSortKey(item):
         sublist = item[idx]
@@ -42,6 +146,20 @@ def getSortMethod(idx):
     return getSortKey
 
 
+def getTimedSortMethod(idx, tableStats):
+    """Returns a sort key getter adding its duration to the column stats."""
+    timer = stats.timer
+
+    def getSortKey(item):
+        item, col, colspan = item[idx]
+        start = timer()
+        key = col.getSortKey(item)
+        tableStats.addColumnTime(col.__name__, "getSortKey", timer() - start)
+        return key
+
+    return getSortKey
+
+
 def getCurrentSortID(sortOn):
     # this may return a string 'id-name-idx' if coming from request,
     # otherwise in Table class it is intialised as a integer string
@@ -56,12 +174,137 @@ def getCurrentSortID(sortOn):
     return currentSortID
 
 
+def getHash(value):
+    """Returns a short hex digest for the given text."""
+    return hashlib.sha1(value.encode("utf-8")).hexdigest()[:16]
+
+
+def getStaticColspan(col):
+    """Returns the constant colspan of a column or None if it is dynamic."""
+    if type(col).getColspan is not column.Column.getColspan:
+        return None
+    if "getColspan" in getattr(col, "__dict__", ()):
+        return None
+    return col.colspan
+
+
+def prefetchGhosts(jar, objects):
+    """Prefetches the ghosts of the connection and returns them."""
+    ghosts = list({
+        id(obj): obj for obj in objects
+        if getattr(obj, "_p_changed", 0) is None and obj._p_jar is jar
+    }.values())
+    if ghosts:
+        jar.prefetch(ghosts)
+    return ghosts
+
+
+def getJSONDefault(value):
+    """Returns a JSON serializable value, e.g. an ISO date, or a string."""
+    isoformat = getattr(value, "isoformat", None)
+    if isoformat is not None:
+        return isoformat()
+    return str(value)
+
+
 def nameColumn(column, name):
     """Give a column a __name__."""
     column.__name__ = name
     return column
 
 
+class Row:
+    """Table row referencing its item and a shared column layout.
+
+    The layout is a tuple of (column, colspan) pairs shared by all rows with
+    the same colspans. Iterating a row returns (item, column, colspan)
+    tuples.
+    """
+
+    __slots__ = ("item", "layout")
+
+    def __init__(self, item, layout):
+        self.item = item
+        self.layout = layout
+
+    def __iter__(self):
+        item = self.item
+        for col, colspan in self.layout:
+            yield item, col, colspan
+
+    def __len__(self):
+        return len(self.layout)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [(self.item, col, colspan)
+                    for col, colspan in self.layout[idx]]
+        col, colspan = self.layout[idx]
+        return self.item, col, colspan
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.item!r}>"
+
+
+class Group:
+    """Rows sharing the same group key.
+
+    Knows its first and last row for rendering the group header and the
+    subtotal rows at the page boundaries.
+    """
+
+    __slots__ = ("key", "aggregates", "length", "firstRow", "lastRow")
+
+    def __init__(self, key, aggregates):
+        self.key = key
+        self.aggregates = aggregates
+        self.length = 0
+        self.firstRow = None
+        self.lastRow = None
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.key!r} {self.length}>"
+
+
+class RowWindow:
+    """Rows of the current batch within all rows of a streamed table.
+
+    Only the rows from ``start`` on are known, the length is the number of
+    all rows. Slices return the known rows within the slice.
+    """
+
+    def __init__(self, rows, start, length):
+        self.rows = rows
+        self.start = start
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(self.length)
+            if step != 1:
+                raise ValueError("Row windows do not support steps")
+            start = max(start - self.start, 0)
+            stop = max(stop - self.start, 0)
+            return self.rows[start:stop]
+        if idx < 0:
+            idx += self.length
+        if not self.start <= idx < self.start + len(self.rows):
+            raise IndexError(idx)
+        return self.rows[idx - self.start]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def getKnownRange(self, start, end):
+        """Returns the part of the range [start, end) with known rows."""
+        known = self.start + len(self.rows)
+        start = min(max(start, self.start), known)
+        return start, min(max(end, start), known)
+
+
 @zope.interface.implementer(interfaces.ITable)
 class Table(zope.location.Location):
     """Generic usable table implementation."""
@@ -77,6 +320,85 @@ class Table(zope.location.Location):
     cssClassSelected = ""
     # css to show sorting, set to None to turn off
     cssClassSortedOn = "sorted-on"
+    # row attribute for the row key e.g. "data-key", set to None to turn off
+    rowKeyAttribute = None
+
+    # tuple of column.ColumnDefinition objects bound per request instead of
+    # calling setUpColumns, set to None to use setUpColumns
+    columnDefinitions = None
+
+    # deactivate the persistent items which were ghosts before sorting and
+    # are not part of the current batch, see deactivateGhosts
+    deactivateSortedItems = False
+
+    # load the state of the persistent items of the batch and the objects
+    # the columns will touch in bulk before rendering, see prefetchRows
+    prefetchItems = False
+
+    # rounds of prefetching the objects the columns return, each round can
+    # return objects referenced by the ones loaded before
+    prefetchDepth = 2
+
+    # cache the rendered thead by the key returned by getHeadCacheKey, the
+    # column headers must only depend on the values of this key
+    cacheHead = False
+
+    # consume the values of unsorted tables in one pass and only keep the
+    # rows of the current batch, see setUpRowWindow
+    streamRows = False
+
+    # render the rows in a process pool with this number of processes if
+    # there are more rows than renderChunkSize, see canRenderParallel
+    renderProcesses = 0
+    renderChunkSize = 2000
+
+    # drop the whitespace between the elements, see getIndents
+    compact = False
+    # put the td and sorting css classes of the columns on col elements
+    # instead of every cell, see renderColGroup
+    cssClassesOnCols = False
+
+    # renderTo writes the encoded table in chunks of about this size (bytes)
+    renderBufferSize = 65536
+
+    # render budget, the batch size gets clamped to maxBatchSize and to the
+    # number of rows maxRows and maxCells allow, working on the rows stops
+    # after maxRenderTime seconds from the start of update, see applyBudget
+    # and getDeadlines
+    maxBatchSize = None
+    maxRows = None
+    maxCells = None
+    maxRenderTime = None
+    # request header giving the seconds left for the response, e.g. set by
+    # the front-end proxy, see getDeadlines
+    deadlineHeader = None
+    # css class and message of the row marking incomplete rendered rows
+    cssClassIncomplete = "incomplete"
+    incompleteMessage = _("The table got truncated.")
+
+    # names of the columns whose group keys group the rows, the groups get a
+    # header row and subtotal rows with the aggregates named in subtotals
+    groupOn = ()
+    subtotals = ("sum",)
+    cssClassGroup = "group"
+    cssClassGroupContinued = "continued"
+    cssClassSubtotal = "subtotal"
+
+    # answer conditional GET requests in update, see handleConditionalGet
+    conditionalGet = False
+
+    # collect phase durations and counts in a TableStats object
+    collectStats = False
+    # collect the time spent in each column, implies collectStats
+    collectColumnStats = False
+    # log the column stats if update and render took longer (seconds)
+    slowRenderThreshold = None
+    # add the column stats as HTML comment to the rendered table
+    columnStatsComment = False
+
+    # sort string sort keys by the collation of the request language, see
+    # z3c.table.collation
+    collateSortKeys = False
 
     # sort attributes
     sortOn = 0
@@ -100,9 +422,35 @@ class Table(zope.location.Location):
         self.columnByName = {}
         self.columns = None
         self.rows = []
+        self.sortedRows = []
+        self.rowLayouts = {}
+        self.headerFactories = {}
+        self.staticColspans = None
+        self.sortIndex = None
+        self.sortGhosts = None
+        self.activatedItems = 0
         self.selectedItems = []
+        self.filters = {}
+        self.aggregates = {}
+        self.groups = []
+        self.rowGroups = None
+        self.rowKeys = None
+        self.notModified = False
+        self.validatorValues = None
+        self.budgetExceeded = None
+        self.incomplete = False
+        self.deadline = None
+        self.deadlineName = None
+        self.stats = None
 
     def initColumns(self):
+        # row layouts refer to the columns, the header factories of the
+        # column types get looked up once per update from the shared cache
+        self.rowLayouts = {}
+        self.headerFactories = {}
+        if self.columnDefinitions is not None:
+            self.bindColumns()
+            return
         # setup columns
         self.columns = self.setUpColumns()
         # order columns
@@ -169,26 +517,49 @@ class Table(zope.location.Location):
             self.columnIndexById[col.id] = idx
             self.columnCounter += 1
 
-    def setUpRow(self, item):
-        cols = []
-        append = cols.append
+    def bindColumns(self):
+        """Binds the column definitions to the request in their order."""
+        definitions, ids = getDefinitionOrder(
+            tuple(self.columnDefinitions), self.prefix
+        )
+        context = self.context
+        request = self.request
+        self.columns = []
+        append = self.columns.append
+        for idx, (definition, id) in enumerate(zip(definitions, ids)):
+            col = definition(context, request, self)
+            col.id = id
+            append(col)
+            self.columnByName[definition.name] = col
+            self.columnIndexById[id] = idx
+        self.columnCounter = len(definitions)
+
+    def getColspans(self, item):
+        """Returns the colspan of each column, None marks a spanned cell."""
+        colspans = []
+        append = colspans.append
         colspanCounter = 0
         countdown = len(self.columns)
-        for col in self.columns:
+        staticColspans = self.staticColspans
+        if staticColspans is None:
+            staticColspans = (None,) * countdown
+        for col, staticColspan in zip(self.columns, staticColspans):
             countdown -= 1
             colspan = 0
             if colspanCounter == 0:
-                colspan = colspanCounter = col.getColspan(item)
+                if staticColspan is None:
+                    colspan = colspanCounter = col.getColspan(item)
+                else:
+                    colspan = colspanCounter = staticColspan
                 # adjust colspan because we define 0, 2, 3, etc.
                 if colspanCounter > 0:
                     colspanCounter -= 1
 
             if colspan == 0 and colspanCounter > 0:
-                # override col if colspan is 0 and colspan coutner not 0
+                # this cell is covered by the colspan of a previous cell
                 colspanCounter -= 1
-                colspan = 0
-                # now we are ready to setup dummy colspan cells
-                col = column.NoneCell(self.context, self.request, self)
+                append(None)
+                continue
 
             # we reached the end of the table and have still colspan
             if (countdown - colspan) < 0:
@@ -196,11 +567,275 @@ class Table(zope.location.Location):
                     "Colspan for column '%s' is larger than the table." % col
                 )
 
-            append((item, col, colspan))
-        return cols
+            append(colspan)
+        return tuple(colspans)
+
+    def getRowLayout(self, colspans):
+        """Returns the shared row layout for the given colspans."""
+        layout = self.rowLayouts.get(colspans)
+        if layout is None:
+            layout = []
+            for col, colspan in zip(self.columns, colspans):
+                if colspan is None:
+                    # setup dummy colspan cells
+                    col = column.NoneCell(self.context, self.request, self)
+                    colspan = 0
+                layout.append((col, colspan))
+            layout = self.rowLayouts[colspans] = tuple(layout)
+        return layout
+
+    def setUpRow(self, item):
+        return Row(item, self.getRowLayout(self.getColspans(item)))
+
+    def getStaticColspans(self):
+        """Returns the constant colspan of each column, None if dynamic."""
+        return tuple(getStaticColspan(col) for col in self.columns)
+
+    def getSortIndex(self):
+        """Returns the sort index answering the current sorting or None.
+
+        A sort index gets used if the sort column declares a
+        ``sortIndexName``, the table context has this index containing all
+        items, the values are the container values, no filter is active and
+        the rows are neither grouped nor collated.
+        """
+        if (self.sortOn is None or not self.columns or self.filters
+                or self.groupOn or self.collateSortKeys):
+            return None
+        col = self.columns[self.columnIndexById.get(self.sortOn, 0)]
+        name = getattr(col, "sortIndexName", None)
+        if name is None or not self.hasContainerValues():
+            return None
+        from z3c.table import sortindex
+        index = sortindex.querySortIndex(self.context, name)
+        if index is not None and len(index) != len(self.context):
+            # items got left out or the index is stale
+            return None
+        return index
+
+    def hasContainerValues(self):
+        """Returns True if the values are all values of the container.
+
+        Only then indexes of the container can answer sorting and
+        filtering.
+        """
+        if type(self).values is not Table.values:
+            return False
+        adapter = zope.component.getMultiAdapter(
+            (self.context, self.request, self), interfaces.IValues
+        )
+        return type(adapter) is value.ValuesForContainer
 
     def setUpRows(self):
-        return [self.setUpRow(item) for item in self.values]
+        self.staticColspans = self.getStaticColspans()
+        self.aggregates = self.setUpAggregates()
+        self.sortIndex = self.getSortIndex()
+        if self.sortIndex is not None:
+            # the rows get set up for the batch only, the aggregates need
+            # an extra pass over the values
+            if self.aggregates:
+                deque(self.aggregateValues(self.values), maxlen=0)
+            from z3c.table import sortindex
+            return sortindex.LazyRows(
+                self, self.sortIndex,
+                self.sortOrder in self.reverseSortOrderNames,
+            )
+        values = self.validatorValues
+        if values is None:
+            values = self.filterValues()
+        self.validatorValues = None
+        if (self.sortOn is None and not self.groupOn
+                and interfaces.ISliceableValues.providedBy(values)):
+            # the rows get set up for the batch only
+            if self.aggregates:
+                deque(self.aggregateValues(values), maxlen=0)
+            return value.SlicedRows(self, values)
+        if self.stats is not None:
+            values = self.stats.timeIterable("values", values)
+        if self.deadline is not None:
+            # only the items seen before the deadline get a row
+            values = self.iterBeforeDeadline(values)
+        if self.aggregates:
+            # aggregate in the same pass setting up the rows
+            values = self.aggregateValues(values)
+        if self.streamRows and self.sortOn is None and not self.groupOn:
+            return self.setUpRowWindow(values)
+        if (None in self.staticColspans
+                or type(self).setUpRow is not Table.setUpRow
+                or type(self).getColspans is not Table.getColspans):
+            return [self.setUpRow(item) for item in values]
+        # all colspans are static, all rows share the same layout which
+        # gets computed for the first item
+        rows = []
+        append = rows.append
+        layout = None
+        for item in values:
+            if layout is None:
+                layout = self.getRowLayout(self.getColspans(item))
+            append(Row(item, layout))
+        return rows
+
+    def setUpRowWindow(self, values):
+        """Returns the rows of the current batch consuming values once.
+
+        Only the items of the current batch, the last batch size items and
+        up to ``startBatchingAt`` items get kept while counting the values.
+        This allows to use one-pass iterables. The batch start gets adjusted
+        like in ``batchRows``.
+        """
+        start = max(self.batchStart, 0)
+        stop = start + self.batchSize
+        head = []
+        window = []
+        tail = deque(maxlen=self.batchSize)
+        length = 0
+        for item in values:
+            if head is not None:
+                if length < self.startBatchingAt:
+                    head.append(item)
+                else:
+                    head = None
+            if start <= length < stop:
+                window.append(item)
+            tail.append(item)
+            length += 1
+        if length <= self.startBatchingAt:
+            return [self.setUpRow(item) for item in head]
+        if start >= length:
+            # show the last batch like batchRows
+            start = max(length - self.batchSize, 0)
+            window = tail
+        self.batchStart = start
+        return RowWindow(
+            [self.setUpRow(item) for item in window], start, length
+        )
+
+    def setUpAggregates(self):
+        """Returns the empty aggregates of the columns by name.
+
+        Only columns listing aggregate names in ``aggregates`` get one.
+        """
+        return {
+            col.__name__: aggregate.Aggregate(col.aggregates)
+            for col in self.columns
+            if getattr(col, "aggregates", None)
+        }
+
+    def aggregateValues(self, values):
+        """Yields the values adding them to the column aggregates.
+
+        The aggregates cover all (filtered) values, not only the batch.
+        """
+        columns = [
+            (col, self.aggregates[col.__name__])
+            for col in self.columns
+            if col.__name__ in self.aggregates
+        ]
+        for item in values:
+            for col, agg in columns:
+                agg.add(col.getAggregateValue(item))
+            yield item
+
+    # filter
+
+    def getFilterArg(self, key):
+        """Returns the string filter argument of the request or None.
+
+        Other values, e.g. the list of a repeated parameter, get ignored.
+        """
+        value = self.request.get(key)
+        if not isinstance(value, str):
+            return None
+        return value
+
+    def getFilters(self):
+        """Returns the filter queries from the request by column name."""
+        filters = {}
+        for col in self.columns:
+            if not getattr(col, "filterable", False):
+                continue
+            key = f"{self.prefix}-filter-{col.__name__}"
+            value = self.getFilterArg(key)
+            low = self.getFilterArg(key + "-min")
+            high = self.getFilterArg(key + "-max")
+            try:
+                if value:
+                    filters[col.__name__] = col.getFilterValue(value)
+                elif low or high:
+                    filters[col.__name__] = (
+                        col.getFilterValue(low) if low else None,
+                        col.getFilterValue(high) if high else None,
+                    )
+            except (TypeError, ValueError):
+                # bad input, ignore this filter
+                continue
+        return filters
+
+    def getFilterQueryStringArgs(self):
+        """Returns the request arguments of the active filters."""
+        args = {}
+        for name in self.filters:
+            key = f"{self.prefix}-filter-{name}"
+            for arg in (key, key + "-min", key + "-max"):
+                value = self.getFilterArg(arg)
+                if value:
+                    args[arg] = value
+        return args
+
+    def getFilterItems(self, keys):
+        """Returns the items for the keys a filter index returned.
+
+        Keys of a stale index without an item get skipped.
+        """
+        items = []
+        for key in sorted(keys):
+            try:
+                items.append(self.context[key])
+            except KeyError:
+                continue
+        return items
+
+    def filterValues(self):
+        """Returns the values matching the current filters.
+
+        Filters on columns providing a filter index get answered by
+        intersecting the index results if the values are the container
+        values, all other filters get applied to the remaining items.
+        """
+        if not self.filters:
+            return self.values
+        keys = None
+        predicates = []
+        indexed = None
+        for col in self.columns:
+            if col.__name__ not in self.filters:
+                continue
+            query = self.filters[col.__name__]
+            index = col.getFilterIndex()
+            if index is not None and indexed is None:
+                indexed = self.hasContainerValues()
+            if index is None or not indexed:
+                predicates.append((col, query))
+                continue
+            result = index.apply(query)
+            if keys is None:
+                keys = set(result)
+            else:
+                keys.intersection_update(result)
+        if keys is None:
+            values = self.values
+        else:
+            values = self.getFilterItems(keys)
+        if predicates:
+            values = (
+                item
+                for item in values
+                if all(col.filterItem(item, query)
+                       for col, query in predicates)
+            )
+            if not self.streamRows:
+                values = list(values)
+        return values
 
     # sort
 
@@ -213,13 +848,169 @@ class Table(zope.location.Location):
         return self.request.get(self.prefix + "-sortOrder", self.sortOrder)
 
     def sortRows(self):
+        if self.sortIndex is not None:
+            # the rows are already sorted by the sort index
+            return
         if self.sortOn is not None and self.rows and self.columns:
+            # remember the ghosts getting activated by the sort keys
+            ghosts = [
+                row[0][0] for row in self.rows
+                if getattr(row[0][0], "_p_changed", 0) is None
+            ]
+            if ghosts:
+                self.sortGhosts = (self.sortGhosts or []) + ghosts
             sortOnIdx = self.columnIndexById.get(self.sortOn, 0)
-            sortKeyGetter = getSortMethod(sortOnIdx)
-            rows = sorted(self.rows, key=sortKeyGetter)
+            if self.collectColumnStats and self.stats is not None:
+                sortKeyGetter = getTimedSortMethod(sortOnIdx, self.stats)
+            else:
+                sortKeyGetter = getSortMethod(sortOnIdx)
+            if self.collateSortKeys:
+                from z3c.table import collation
+                sortKeyGetter = collation.collateSortMethod(
+                    sortKeyGetter, self.getCollationLanguage())
+            if self.deadline is None:
+                rows = sorted(self.rows, key=sortKeyGetter)
+            else:
+                # only the rows with a sort key extracted before the
+                # deadline get sorted and kept
+                keys = [
+                    sortKeyGetter(row)
+                    for row in self.iterBeforeDeadline(self.rows)
+                ]
+                order = sorted(range(len(keys)), key=keys.__getitem__)
+                rows = [self.rows[idx] for idx in order]
             if self.sortOrder in self.reverseSortOrderNames:
                 rows.reverse()
             self.rows = rows
+            if self.stats is not None:
+                self.stats.addCount("sortKeys", len(rows))
+
+    # group
+
+    def groupRows(self):
+        """Orders the sorted rows by group and sets up the groups.
+
+        The rows get collected per group in one pass keeping their sort
+        order inside the group, the groups get ordered by their key. The
+        subtotal aggregates cover all rows of a group, not only the batch.
+        """
+        self.groups = []
+        self.rowGroups = None
+        if not self.groupOn or not self.columns:
+            return
+        columns = [self.columnByName[name] for name in self.groupOn]
+        subtotals = set(self.subtotals)
+        aggregateColumns = [
+            col for col in self.columns
+            if subtotals.intersection(getattr(col, "aggregates", ()))
+        ]
+        buckets = {}
+        for row in self.rows:
+            item = row[0][0]
+            key = tuple(col.getGroupKey(item) for col in columns)
+            bucket = buckets.get(key)
+            if bucket is None:
+                group = Group(key, {
+                    col.__name__: aggregate.Aggregate(
+                        name for name in aggregate.AGGREGATES
+                        if name in subtotals and name in col.aggregates)
+                    for col in aggregateColumns
+                })
+                bucket = buckets[key] = (group, [])
+            group, rows = bucket
+            rows.append(row)
+            for col in aggregateColumns:
+                group.aggregates[col.__name__].add(
+                    col.getAggregateValue(item))
+        groupKeyGetter = None
+        if self.collateSortKeys:
+            from z3c.table import collation
+            groupKeyGetter = collation.getCollationKeyGetter(
+                self.getCollationLanguage())
+        self.rows = []
+        self.rowGroups = {}
+        for key in sorted(buckets, key=groupKeyGetter):
+            group, rows = buckets[key]
+            group.length = len(rows)
+            group.firstRow = rows[0]
+            group.lastRow = rows[-1]
+            self.groups.append(group)
+            self.rows.extend(rows)
+            for row in rows:
+                self.rowGroups[id(row)] = group
+        if self.stats is not None:
+            self.stats.addCount("groups", len(self.groups))
+
+    def getCollationLanguage(self):
+        """Returns the language collating the sort keys or None."""
+        languages = getPreferredLanguages(self.request)
+        return languages[0] if languages else None
+
+    def deactivateGhosts(self):
+        """Deactivates the items activated for sorting only.
+
+        Counts the items which were ghosts before sorting or computing the
+        validators and got activated and deactivates them if they are not
+        part of the current batch and ``deactivateSortedItems`` is set.
+        """
+        ghosts = self.sortGhosts or ()
+        self.sortGhosts = None
+        activated = [item for item in ghosts if item._p_changed is not None]
+        self.activatedItems = len(activated)
+        deactivated = 0
+        if self.deactivateSortedItems and activated:
+            keep = {id(row[0][0]) for row in self.rows}
+            for item in activated:
+                if id(item) not in keep:
+                    item._p_deactivate()
+                    deactivated += 1
+        if self.stats is not None:
+            self.stats.addCount("activatedItems", self.activatedItems)
+            self.stats.addCount("deactivatedItems", deactivated)
+
+    # prefetch
+
+    def prefetchRows(self):
+        """Prefetches the persistent items of the rows in bulk.
+
+        First the ghost items get prefetched from their connection, then the
+        ghost objects returned by the ``getPrefetchObjects`` method of the
+        columns. These get loaded and the columns get asked again up to
+        ``prefetchDepth`` times. Storages not supporting prefetch ignore it.
+        """
+        items = [row[0][0] for row in self.rows]
+        jar = None
+        for item in items:
+            jar = getattr(item, "_p_jar", None)
+            if jar is not None:
+                break
+        if jar is None:
+            return
+        count = len(prefetchGhosts(jar, items))
+        # the related objects are known once the items got loaded, the
+        # prefetched ones get loaded for finding the objects they refer to
+        # columns not based on Column don't know about prefetching
+        getters = [
+            getter for getter in (
+                getattr(col, "getPrefetchObjects", None)
+                for col in self.columns
+            )
+            if getter is not None
+        ]
+        for depth in range(self.prefetchDepth):
+            ghosts = prefetchGhosts(jar, [
+                obj
+                for getPrefetchObjects in getters
+                for item in items
+                for obj in getPrefetchObjects(item)
+            ])
+            if not ghosts:
+                break
+            count += len(ghosts)
+            for ghost in ghosts:
+                ghost._p_activate()
+        if self.stats is not None:
+            self.stats.addCount("prefetched", count)
 
     # batch
 
@@ -242,6 +1033,77 @@ class Table(zope.location.Location):
         except ValueError:
             return self.batchStart
 
+    def getRowLimits(self):
+        """Returns the (name, number of rows) pairs of the budget limits.
+
+        The limits are ``maxBatchSize``, ``maxRows`` and the number of rows
+        ``maxCells`` allows.
+        """
+        limits = []
+        if self.maxBatchSize is not None:
+            limits.append(("maxBatchSize", self.maxBatchSize))
+        if self.maxRows is not None:
+            limits.append(("maxRows", self.maxRows))
+        if self.maxCells is not None and self.columns:
+            limits.append(
+                ("maxCells", max(self.maxCells // len(self.columns), 1)))
+        return limits
+
+    def applyBudget(self):
+        """Clamps the batch size to the row limits of the budget.
+
+        If the batch size asked for by the request exceeds a limit,
+        ``budgetExceeded`` gets set to the name of the limit. Tables with
+        more rows than ``maxRows`` or ``maxCells`` allow get batched.
+        """
+        try:
+            requested = int(self.request.get(self.prefix + "-batchSize"))
+        except (TypeError, ValueError):
+            requested = None
+        for name, limit in self.getRowLimits():
+            if self.batchSize > limit:
+                self.batchSize = limit
+                if requested is not None and requested > limit:
+                    self.budgetExceeded = name
+            if name != "maxBatchSize" and self.startBatchingAt > limit:
+                self.startBatchingAt = limit
+
+    def getDeadlines(self):
+        """Returns the (name, timer value) pairs of the deadlines.
+
+        The deadlines are ``maxRenderTime`` seconds from now and the
+        seconds left given by the ``deadlineHeader`` request header. Bad
+        header values get ignored. Override this method for getting a
+        deadline from somewhere else, e.g. the publisher.
+        """
+        now = stats.timer()
+        deadlines = []
+        if self.maxRenderTime is not None:
+            deadlines.append(("maxRenderTime", now + self.maxRenderTime))
+        if self.deadlineHeader:
+            try:
+                seconds = float(self.request.getHeader(self.deadlineHeader))
+            except (TypeError, ValueError):
+                seconds = None
+            if seconds is not None and seconds == seconds:
+                deadlines.append(("deadline", now + seconds))
+        return deadlines
+
+    def isPastDeadline(self):
+        """Returns True and marks the table incomplete if time is up."""
+        if self.deadline is None or stats.timer() <= self.deadline:
+            return False
+        self.incomplete = True
+        self.budgetExceeded = self.deadlineName
+        return True
+
+    def iterBeforeDeadline(self, iterable):
+        """Yields the values until the deadline passes."""
+        for item in iterable:
+            if self.isPastDeadline():
+                return
+            yield item
+
     def batchRows(self):
         length = len(self.rows)
         if length > self.startBatchingAt:
@@ -250,11 +1112,13 @@ class Table(zope.location.Location):
             if self.batchStart < 0:
                 self.batchStart = 0
 
+            from z3c.batching.batch import Batch
             self.rows = Batch(
                 self.rows, start=self.batchStart, size=self.batchSize
             )
 
     def updateBatch(self):
+        from z3c.batching.interfaces import IBatch
         if IBatch.providedBy(self.rows):
             self.batchProvider = zope.component.getMultiAdapter(
                 (self.context, self.request, self),
@@ -263,6 +1127,211 @@ class Table(zope.location.Location):
             )
             self.batchProvider.update()
 
+    def getRowKey(self, row, position=None):
+        """Returns a stable row key based on the item name.
+
+        Items without a name get a key based on the position of the row in
+        the sorted rows or, if the position is unknown, on the item id.
+        """
+        item, col, colspan = row[0]
+        try:
+            name = column.getName(item)
+        except AttributeError:
+            name = None
+        if name is not None:
+            return f"{self.prefix}-row-{name}"
+        if position is not None:
+            return f"{self.prefix}-position-{position}"
+        return f"{self.prefix}-id-{id(item)}"
+
+    def getRowKeys(self, rows, start=0):
+        """Returns the unique keys of the rows starting at position start.
+
+        Duplicate keys get the number of their occurrence appended.
+        """
+        keys = []
+        seen = set()
+        for counter, row in enumerate(rows):
+            key = unique = self.getRowKey(row, start + counter)
+            number = 1
+            while unique in seen:
+                number += 1
+                unique = f"{key}-{number}"
+            seen.add(unique)
+            keys.append(unique)
+        return keys
+
+    def getBatchRowKeys(self):
+        """Returns the unique keys of the current batch rows by row id."""
+        if self.rowKeys is None:
+            rows = list(self.rows)
+            keys = self.getRowKeys(rows, getattr(self.rows, "start", 0))
+            self.rowKeys = {id(row): key for row, key in zip(rows, keys)}
+        return self.rowKeys
+
+    def getRowVersion(self, row):
+        """Returns a version of the row item or None.
+
+        A version, e.g. a modification stamp, allows to compute the row hash
+        without rendering the row.
+        """
+        return None
+
+    # conditional get
+
+    def getItemStamp(self, item):
+        """Returns a modification stamp of the item or None if unknown."""
+        if getattr(item, "_p_jar", None) is not None:
+            if item._p_changed is None:
+                # the serial of a ghost is not known before loading its
+                # state, deactivateGhosts counts and deactivates it
+                item._p_activate()
+                if self.sortGhosts is None:
+                    self.sortGhosts = []
+                self.sortGhosts.append(item)
+            return item._p_serial
+        dc = column.getDublinCore(item)
+        if dc is not None:
+            return dc.modified
+        return None
+
+    def getContainerStamp(self):
+        """Returns a stamp which changes if items get added or removed."""
+        dc = column.getDublinCore(self.context)
+        if dc is not None:
+            return dc.modified
+        return None
+
+    def getGeneration(self):
+        """Returns a stamp which changes with any change of the values.
+
+        Returns None by default. Applications maintaining a generation
+        counter, e.g. updated by event subscribers, can return it. Then the
+        validators don't need the stamps of the items.
+        """
+        return None
+
+    def getValidatorStamps(self):
+        """Returns the number of items and the relevant item stamps.
+
+        Unsorted tables only depend on the number of items and the items in
+        the current batch, sorted tables depend on all items. The stamps are
+        None if an item stamp is unknown or the values can only get iterated
+        once. A generation replaces the item stamps. Otherwise the filtered
+        values get kept for setting up the rows.
+        """
+        generation = self.getGeneration()
+        if generation is not None:
+            return None, [generation]
+        values = self.filterValues()
+        if iter(values) is values:
+            # one-pass values are needed for setting up the rows
+            return None, None
+        # setting up the rows reuses the filtered values
+        self.validatorValues = values
+        length = None
+        if self.sortOn is None:
+            values = list(values)
+            length = len(values)
+            if length > self.startBatchingAt:
+                start = self.batchStart
+                if start >= length:
+                    start = length - self.batchSize
+                start = max(start, 0)
+                values = values[start:start + self.batchSize]
+        stamps = []
+        for item in values:
+            stamp = self.getItemStamp(item)
+            if stamp is None:
+                return length, None
+            stamps.append(stamp)
+        return length, stamps
+
+    def getValidators(self):
+        """Returns the ETag and the last modification date or None.
+
+        The ETag depends on the columns, the sort, batch and filter state,
+        the request locale, the table request parameters like selected items
+        and the item stamps. No ETag is returned if an item stamp is unknown.
+        """
+        length, stamps = self.getValidatorStamps()
+        if stamps is None:
+            return None, None
+        containerStamp = self.getContainerStamp()
+        locale = getattr(self.request, "locale", None)
+        form = getattr(self.request, "form", {})
+        args = sorted(
+            (key, str(value))
+            for key, value in form.items()
+            if key.startswith(self.prefix + "-")
+        )
+        state = (
+            [col.id for col in self.columns],
+            self.sortOn,
+            self.sortOrder,
+            self.batchStart,
+            self.batchSize,
+            locale.getLocaleID() if locale is not None else None,
+            args,
+            containerStamp,
+            length,
+            stamps,
+        )
+        etag = '"%s"' % getHash(repr(state))
+        # a date is only known if the container date covers removed items
+        dates = [containerStamp] + stamps
+        lastModified = None
+        if all(isinstance(date, datetime.datetime) for date in dates):
+            lastModified = max(
+                date if date.tzinfo else
+                date.replace(tzinfo=datetime.timezone.utc)
+                for date in dates
+            )
+        return etag, lastModified
+
+    def isNotModified(self, etag, lastModified):
+        """Returns True if the client already has the current version."""
+        ifNoneMatch = self.request.getHeader("If-None-Match")
+        if ifNoneMatch:
+            tags = [tag.strip() for tag in ifNoneMatch.split(",")]
+            tags = [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+            return etag in tags or "*" in tags
+        ifModifiedSince = self.request.getHeader("If-Modified-Since")
+        if ifModifiedSince and lastModified is not None:
+            import email.utils
+            try:
+                since = email.utils.parsedate_to_datetime(ifModifiedSince)
+            except (TypeError, ValueError):
+                return False
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=datetime.timezone.utc)
+            return lastModified.replace(microsecond=0) <= since
+        return False
+
+    def handleConditionalGet(self):
+        """Set the validator headers and answer with 304 if not modified.
+
+        Returns True if the response is a 304 and nothing needs to get
+        rendered.
+        """
+        if getattr(self.request, "method", "GET") not in ("GET", "HEAD"):
+            return False
+        etag, lastModified = self.getValidators()
+        if etag is None:
+            return False
+        response = self.request.response
+        response.setHeader("ETag", etag)
+        if lastModified is not None:
+            import email.utils
+            response.setHeader(
+                "Last-Modified",
+                email.utils.format_datetime(lastModified, usegmt=True),
+            )
+        if self.isNotModified(etag, lastModified):
+            response.setStatus(304)
+            return True
+        return False
+
     def isSelectedRow(self, row):
         item, col, colspan = row[0]
         if item in self.selectedItems:
@@ -274,78 +1343,666 @@ class Table(zope.location.Location):
     def renderBatch(self):
         if self.batchProvider is None:
             return ""
-        return self.batchProvider.render()
+        with self.measure("renderBatch"):
+            return self.batchProvider.render()
+
+    def getIndents(self):
+        """Returns the whitespace put before the elements by nesting level."""
+        return COMPACT_INDENTS if self.compact else INDENTS
 
     def renderTable(self):
         if self.columns:
             cssClass = self.getCSSClass("table")
+            colgroup = self.renderColGroup()
             head = self.renderHead()
             body = self.renderBody()
-            return f"<table{cssClass}>{head}{body}\n</table>"
+            foot = self.renderFoot()
+            return "<table{}>{}{}{}{}{}</table>".format(
+                cssClass, colgroup, head, body, foot, self.getIndents()[0]
+            )
         return ""
 
+    def renderColGroup(self):
+        """Renders the colgroup if the css classes are set on the columns."""
+        if not self.cssClassesOnCols:
+            return ""
+        indents = self.getIndents()
+        cols = []
+        for col in self.columns:
+            cssClass = self.getCSSSortClass(col, col.cssClasses.get("td"))
+            cssClass = self.getCSSClass("col", cssClass)
+            cols.append(f"{indents[2]}<col{cssClass} />")
+        return "{}<colgroup>{}{}</colgroup>".format(
+            indents[1], "".join(cols), indents[1]
+        )
+
     def renderHead(self):
+        key = self.getHeadCacheKey() if self.cacheHead else None
+        if key is not None:
+            try:
+                head = headCache.get(key)
+            except TypeError:
+                # request values which can't get hashed don't get cached
+                key = head = None
+            if head is not None:
+                return head
         cssClass = self.getCSSClass("thead")
         rStr = self.renderHeadRow()
-        return f"\n  <thead{cssClass}>{rStr}\n  </thead>"
+        indent = self.getIndents()[1]
+        head = f"{indent}<thead{cssClass}>{rStr}{indent}</thead>"
+        if key is not None:
+            if len(headCache) >= HEAD_CACHE_SIZE:
+                headCache.clear()
+            headCache[key] = head
+        return head
 
     def renderHeadRow(self):
         cssClass = self.getCSSClass("tr")
         cells = [self.renderHeadCell(col) for col in self.columns]
-        return "\n    <tr{}>{}\n    </tr>".format(cssClass, "".join(cells))
+        indent = self.getIndents()[2]
+        return "{}<tr{}>{}{}</tr>".format(
+            indent, cssClass, "".join(cells), indent
+        )
 
     def renderHeadCell(self, column):
         cssClass = column.cssClasses.get("th")
         cssClass = self.getCSSSortClass(column, cssClass)
         cssClass = self.getCSSClass("th", cssClass)
-        return f"\n      <th{cssClass}>{column.renderHeadCell()}</th>"
+        indent = self.getIndents()[3]
+        return f"{indent}<th{cssClass}>{column.renderHeadCell()}</th>"
+
+    def queryColumnHeader(self, column):
+        """Returns the IColumnHeader of the column or None.
+
+        The header factory gets looked up once per column type and cached
+        across requests by the adapter registry.
+        """
+        provided = zope.interface.providedBy(column)
+        try:
+            factory = self.headerFactories[provided]
+        except KeyError:
+            adapters = zope.component.getSiteManager().adapters
+            required = (
+                zope.interface.providedBy(self.context),
+                zope.interface.providedBy(self.request),
+                zope.interface.providedBy(self),
+                provided,
+            )
+            cache = getHeaderFactoryCache(adapters)
+            try:
+                factory = cache[required]
+            except KeyError:
+                factory = cache[required] = adapters.lookup(
+                    required, interfaces.IColumnHeader
+                )
+            self.headerFactories[provided] = factory
+        if factory is None:
+            return None
+        return factory(self.context, self.request, self, column)
+
+    def getHeadCacheKey(self):
+        """Returns the key of the rendered thead.
+
+        The key contains the table class, prefix and css classes, the
+        columns with their header and css classes, the sort state, the
+        filter arguments, the request arguments the column headers use and
+        the preferred languages.
+        """
+        columns = []
+        args = set()
+        for col in self.columns:
+            columns.append((
+                col.id, type(col), col.header, getCSSKey(col.cssClasses)
+            ))
+            provided = zope.interface.providedBy(col)
+            if provided not in self.headerFactories:
+                self.queryColumnHeader(col)
+            factory = self.headerFactories[provided]
+            args.update(getattr(factory, "_request_args", ()))
+        return (
+            type(self),
+            self.prefix,
+            getCSSKey(self.cssClasses),
+            self.cssClassSortedOn,
+            tuple(columns),
+            self.sortOn,
+            self.sortOrder,
+            self.compact,
+            tuple(sorted(self.getFilterQueryStringArgs().items())),
+            tuple(
+                (arg, getCacheValue(self.request.get(arg)))
+                for arg in sorted(args)
+            ),
+            getPreferredLanguages(self.request),
+        )
 
     def renderBody(self):
         cssClass = self.getCSSClass("tbody")
-        rStr = self.renderRows()
-        return f"\n  <tbody{cssClass}>{rStr}\n  </tbody>"
+        with self.measure("renderRows"):
+            rStr = self.renderRows()
+        indent = self.getIndents()[1]
+        return f"{indent}<tbody{cssClass}>{rStr}{indent}</tbody>"
+
+    def renderFoot(self):
+        """Renders a footer row per aggregate name used by the columns."""
+        if not self.aggregates:
+            return ""
+        names = set()
+        for agg in self.aggregates.values():
+            names.update(agg.names)
+        rows = [
+            self.renderFootRow(name)
+            for name in aggregate.AGGREGATES
+            if name in names
+        ]
+        cssClass = self.getCSSClass("tfoot")
+        indent = self.getIndents()[1]
+        return "{}<tfoot{}>{}{}</tfoot>".format(
+            indent, cssClass, "".join(rows), indent
+        )
+
+    def renderFootRow(self, name):
+        return self.renderAggregateRow(self.aggregates, name, name)
+
+    def renderAggregateRow(self, aggregates, name, cssClass=None):
+        """Renders a row with the named aggregate of each column."""
+        cssClass = self.getCSSClass("tr", cssClass)
+        indents = self.getIndents()
+        cells = []
+        for col in self.columns:
+            agg = aggregates.get(col.__name__)
+            if agg is None or name not in agg.names:
+                content = ""
+            else:
+                content = col.renderFootCell(agg, name)
+            cells.append("{}<td{}>{}</td>".format(
+                indents[3], self.getCSSClass("td"), content
+            ))
+        return "{}<tr{}>{}{}</tr>".format(
+            indents[2], cssClass, "".join(cells), indents[2]
+        )
+
+    def renderGroupHeaderRow(self, group, continued=False):
+        """Renders the row starting a group.
+
+        A group continued from the previous page gets the
+        ``cssClassGroupContinued`` css class.
+        """
+        cssClass = self.cssClassGroup
+        if continued:
+            cssClass = f"{cssClass} {self.cssClassGroupContinued}"
+        title = ", ".join(
+            self.columnByName[name].renderGroupHeader(key)
+            for name, key in zip(self.groupOn, group.key)
+        )
+        indents = self.getIndents()
+        return '{}<tr{}>{}<th colspan="{}">{}</th>{}</tr>'.format(
+            indents[2], self.getCSSClass("tr", cssClass), indents[3],
+            len(self.columns), title, indents[2],
+        )
+
+    def renderSubtotalRows(self, group):
+        """Renders a row per subtotal aggregate ending the group."""
+        names = set()
+        for agg in group.aggregates.values():
+            names.update(agg.names)
+        return "".join(
+            self.renderAggregateRow(
+                group.aggregates, name, f"{self.cssClassSubtotal} {name}")
+            for name in aggregate.AGGREGATES
+            if name in names
+        )
+
+    def renderGroupRows(self, row, current):
+        """Returns the group rows before the row and the row group.
+
+        ``current`` is the group of the previous row on the page.
+        """
+        group = self.rowGroups[id(row)]
+        if group is current:
+            return "", group
+        return self.renderGroupHeaderRow(
+            group, continued=row is not group.firstRow), group
+
+    def canRenderParallel(self):
+        """Returns True if the rows can get rendered in a process pool.
+
+        This requires column definitions, parallel safe columns, no column
+        statistics, no deadline and the default row and cell rendering.
+        """
+        if (self.renderProcesses < 2 or self.columnDefinitions is None
+                or self.rowGroups is not None or self.deadline is not None):
+            return False
+        if len(self.rows) <= self.renderChunkSize or self.collectColumnStats:
+            return False
+        cls = type(self)
+        for name in ("renderRow", "renderCell", "getCSSHighlightClass"):
+            if getattr(cls, name) is not getattr(Table, name):
+                return False
+        from z3c.table import parallel
+        return all(parallel.isParallelSafe(col) for col in self.columns)
 
     def renderRows(self):
-        counter = 0
-        rows = []
-        cssClasses = (self.cssClassEven, self.cssClassOdd)
-        append = rows.append
-        for row in self.rows:
-            append(self.renderRow(row, cssClasses[counter % 2]))
-            counter += 1
-        return "".join(rows)
+        counter = len(self.rows)
+        result = None
+        if self.canRenderParallel():
+            from z3c.table import parallel
+            result = parallel.renderRows(self)
+            if result is not None and self.stats is not None:
+                self.stats.addCount("parallelRows", counter)
+        if result is None:
+            rows = []
+            cssClasses = (self.cssClassEven, self.cssClassOdd)
+            append = rows.append
+            grouped = self.rowGroups is not None
+            group = None
+            counter = 0
+            for idx, row in enumerate(self.rows):
+                if self.isPastDeadline():
+                    break
+                if grouped:
+                    groupRows, group = self.renderGroupRows(row, group)
+                    append(groupRows)
+                append(self.renderRow(row, cssClasses[idx % 2]))
+                if grouped and row is group.lastRow:
+                    append(self.renderSubtotalRows(group))
+                counter += 1
+            result = "".join(rows)
+        if self.incomplete:
+            result += self.renderIncompleteRow()
+        self.addRenderCounts(counter)
+        return result
+
+    def addRenderCounts(self, counter):
+        """Adds the number of the first counter rendered rows and cells."""
+        if self.stats is not None:
+            self.stats.addCount("renderedRows", counter)
+            self.stats.addCount("renderedCells", sum(
+                1
+                for row in itertools.islice(self.rows, counter)
+                for item, col, colspan in row
+                if not interfaces.INoneCell.providedBy(col)
+            ))
+
+    def renderIncompleteRow(self):
+        """Returns the row marking the rows as incomplete."""
+        indents = self.getIndents()
+        cssClass = self.getCSSClass("tr", self.cssClassIncomplete)
+        message = html.escape(
+            zope.i18n.translate(self.incompleteMessage, context=self.request)
+        )
+        return '{}<tr{}>{}<td colspan="{}">{}</td>{}</tr>'.format(
+            indents[2], cssClass, indents[3], len(self.columns), message,
+            indents[2],
+        )
 
-    def renderRow(self, row, cssClass=None):
+    def renderRowStart(self, row, cssClass=None):
+        """Returns the opening tr tag of the row."""
         isSelected = self.isSelectedRow(row)
         if isSelected and self.cssClassSelected and cssClass:
             cssClass = f"{self.cssClassSelected} {cssClass}"
         elif isSelected and self.cssClassSelected:
             cssClass = self.cssClassSelected
         cssClass = self.getCSSClass("tr", cssClass)
+        if self.rowKeyAttribute:
+            key = self.getBatchRowKeys().get(id(row))
+            if key is None:
+                key = self.getRowKey(row)
+            cssClass += f" {self.rowKeyAttribute}={quoteattr(key)}"
+        return f"{self.getIndents()[2]}<tr{cssClass}>"
+
+    def renderRowEnd(self):
+        """Returns the closing tr tag."""
+        return self.getIndents()[2] + "</tr>"
+
+    def renderRow(self, row, cssClass=None):
         cells = [
             self.renderCell(item, col, colspan) for item, col, colspan in row
         ]
-        return "\n    <tr{}>{}\n    </tr>".format(cssClass, "".join(cells))
+        return "{}{}{}".format(
+            self.renderRowStart(row, cssClass), "".join(cells),
+            self.renderRowEnd(),
+        )
 
-    def renderCell(self, item, column, colspan=0):
-        if interfaces.INoneCell.providedBy(column):
+    def renderRowsDiff(self, hashes):
+        """Returns the rows which differ from the given row hashes.
+
+        The hashes map the row keys to the row hashes the client got before.
+        The result contains the current row keys in order, their hashes, the
+        rendered inserted and changed rows and the keys of removed rows.
+        """
+        keys = []
+        result = {
+            "keys": keys,
+            "hashes": {},
+            "inserted": {},
+            "changed": {},
+            "removed": [],
+        }
+        cssClasses = (self.cssClassEven, self.cssClassOdd)
+        rowKeys = self.getBatchRowKeys()
+        for counter, row in enumerate(self.rows):
+            cssClass = cssClasses[counter % 2]
+            key = rowKeys[id(row)]
+            keys.append(key)
+            version = self.getRowVersion(row)
+            rendered = None
+            if version is not None:
+                selected = self.isSelectedRow(row)
+                rowHash = getHash(f"{version!r} {cssClass} {selected}")
+            else:
+                rendered = self.renderRow(row, cssClass)
+                rowHash = getHash(rendered)
+            result["hashes"][key] = rowHash
+            previous = hashes.get(key)
+            if previous == rowHash:
+                continue
+            if rendered is None:
+                rendered = self.renderRow(row, cssClass)
+            if previous is None:
+                result["inserted"][key] = rendered
+            else:
+                result["changed"][key] = rendered
+        current = result["hashes"]
+        result["removed"] = [key for key in hashes if key not in current]
+        return result
+
+    # row ranges
+
+    def getRowRangeArgs(self):
+        """Returns the row range from the request.
+
+        The range is given as ``<prefix>-rowStart`` and ``<prefix>-rowEnd``
+        and defaults to batch size rows. Bad input gets ignored.
+        """
+        try:
+            start = int(self.request.get(self.prefix + "-rowStart", 0))
+        except ValueError:
+            start = 0
+        try:
+            end = int(self.request.get(self.prefix + "-rowEnd"))
+        except (TypeError, ValueError):
+            end = start + self.batchSize
+        return start, end
+
+    def getRowRange(self, start=None, end=None):
+        """Returns the column metadata and the cell values of a row range.
+
+        The range ``[start, end)`` refers to all rows in the current sort
+        order and not only to the current batch. Tables streaming their rows
+        only return the part of the range within the current batch. Cells
+        covered by a colspan
+        are None and rows using a colspan list the colspan of each cell. A
+        range given as None gets read from the request.
+        """
+        if start is None or end is None:
+            start, end = self.getRowRangeArgs()
+        total = len(self.sortedRows)
+        start = min(max(start, 0), total)
+        end = min(max(end, start), total)
+        if isinstance(self.sortedRows, RowWindow):
+            # streamed rows are only known within the current batch
+            start, end = self.sortedRows.getKnownRange(start, end)
+        for name, limit in self.getRowLimits():
+            if end - start > limit:
+                end = start + limit
+                self.budgetExceeded = name
+        columns = []
+        getters = []
+        for col in self.columns:
+            columns.append({
+                "id": col.id,
+                "name": col.__name__,
+                "header": zope.i18n.translate(col.header,
+                                              context=self.request),
+            })
+            getters.append(getattr(col, "getJSONValue", col.renderCell))
+        rows = []
+        rangeRows = self.sortedRows[start:end]
+        rangeKeys = self.getRowKeys(rangeRows, start)
+        for row, key in self.iterBeforeDeadline(zip(rangeRows, rangeKeys)):
+            cells = []
+            colspans = []
+            for idx, (item, col, colspan) in enumerate(row):
+                colspans.append(colspan)
+                if interfaces.INoneCell.providedBy(col):
+                    cells.append(None)
+                else:
+                    cells.append(getters[idx](item))
+            data = {"key": key, "cells": cells}
+            if any(colspans):
+                data["colspans"] = colspans
+            rows.append(data)
+        if self.stats is not None:
+            self.stats.addCount("rangeRows", len(rows))
+        result = {
+            "columns": columns,
+            "sortOn": self.sortOn,
+            "sortOrder": self.sortOrder,
+            "total": total,
+            "start": start,
+            "end": start + len(rows),
+            "rows": rows,
+        }
+        if self.budgetExceeded is not None:
+            result["budgetExceeded"] = self.budgetExceeded
+            result["incomplete"] = self.incomplete
+        return result
+
+    def renderJSON(self, start=None, end=None):
+        """Returns the row range as compact JSON."""
+        if self.notModified:
             return ""
-        cssClass = column.cssClasses.get("td")
-        cssClass = self.getCSSHighlightClass(column, item, cssClass)
-        cssClass = self.getCSSSortClass(column, cssClass)
+        with self.measure("renderJSON"):
+            return json.dumps(self.getRowRange(start, end),
+                              separators=(",", ":"), default=getJSONDefault)
+
+    def renderCellStart(self, item, column, colspan=0):
+        """Returns the opening td tag of the cell."""
+        if self.cssClassesOnCols:
+            # the column classes are set on the col elements
+            cssClass = self.getCSSHighlightClass(column, item, None)
+        else:
+            cssClass = column.cssClasses.get("td")
+            cssClass = self.getCSSHighlightClass(column, item, cssClass)
+            cssClass = self.getCSSSortClass(column, cssClass)
         cssClass = self.getCSSClass("td", cssClass)
         colspanStr = ' colspan="%s"' % colspan if colspan else ""
-        return "\n      <td{}{}>{}</td>".format(
-            cssClass,
-            colspanStr,
-            column.renderCell(item),
+        return f"{self.getIndents()[3]}<td{cssClass}{colspanStr}>"
+
+    def renderCell(self, item, column, colspan=0):
+        if interfaces.INoneCell.providedBy(column):
+            return ""
+        if self.collectColumnStats and self.stats is not None:
+            start = stats.timer()
+            content = column.renderCell(item)
+            self.stats.addColumnTime(
+                column.__name__, "renderCell", stats.timer() - start
+            )
+        else:
+            content = column.renderCell(item)
+        return "{}{}</td>".format(
+            self.renderCellStart(item, column, colspan), content
+        )
+
+    def canWriteCells(self):
+        """Returns True if the rows can get written cell by cell.
+
+        This requires the default row and cell rendering and no column
+        statistics.
+        """
+        if self.collectColumnStats or self.rowGroups is not None:
+            return False
+        cls = type(self)
+        return all(
+            getattr(cls, name) is getattr(Table, name)
+            for name in ("renderRow", "renderCell")
+        )
+
+    def writeRows(self, buffer, flush):
+        """Appends the encoded rows to the buffer.
+
+        The opening tags of the rows and cells are encoded once per row
+        class and per column and colspan if possible, only the cell content
+        gets encoded per cell. Returns the number of written rows.
+        """
+        cssClasses = (self.cssClassEven, self.cssClassOdd)
+        counter = 0
+        if not self.canWriteCells():
+            grouped = self.rowGroups is not None
+            group = None
+            for idx, row in enumerate(self.rows):
+                if self.isPastDeadline():
+                    break
+                if grouped:
+                    groupRows, group = self.renderGroupRows(row, group)
+                    buffer += groupRows.encode()
+                buffer += self.renderRow(row, cssClasses[idx % 2]).encode()
+                if grouped and row is group.lastRow:
+                    buffer += self.renderSubtotalRows(group).encode()
+                counter += 1
+                flush()
+            return counter
+        cls = type(self)
+        staticRowStart = (
+            not self.rowKeyAttribute
+            and not self.cssClassSelected
+            and cls.renderRowStart is Table.renderRowStart
+        )
+        staticCellStart = (
+            cls.renderCellStart is Table.renderCellStart
+            and cls.getCSSHighlightClass is Table.getCSSHighlightClass
         )
+        rowStarts = {}
+        cellStarts = {}
+        rowEnd = self.renderRowEnd().encode()
+        noneCells = {
+            id(col) for col in self.columns
+            if interfaces.INoneCell.providedBy(col)
+        }
+        for idx, row in enumerate(self.rows):
+            if self.isPastDeadline():
+                break
+            cssClass = cssClasses[idx % 2]
+            if staticRowStart:
+                rowStart = rowStarts.get(cssClass)
+                if rowStart is None:
+                    rowStart = rowStarts[cssClass] = self.renderRowStart(
+                        row, cssClass).encode()
+                buffer += rowStart
+            else:
+                buffer += self.renderRowStart(row, cssClass).encode()
+            for item, col, colspan in row:
+                if id(col) in noneCells:
+                    continue
+                if staticCellStart:
+                    key = (id(col), colspan)
+                    cellStart = cellStarts.get(key)
+                    if cellStart is None:
+                        cellStart = cellStarts[key] = self.renderCellStart(
+                            item, col, colspan).encode()
+                    buffer += cellStart
+                else:
+                    buffer += self.renderCellStart(item, col, colspan).encode()
+                buffer += str(col.renderCell(item)).encode()
+                buffer += b"</td>"
+            buffer += rowEnd
+            counter += 1
+            flush()
+        return counter
+
+    def renderTo(self, writer):
+        """Writes the UTF-8 encoded table to the writer.
+
+        The writer is a file like object, e.g. a BytesIO, a temporary file
+        or the streaming response of Zope 2. The response of zope.publisher
+        does not support writing.
+        The result is the same as ``render().encode()`` but gets written in
+        chunks of about ``renderBufferSize`` bytes without building the
+        table as one string.
+        """
+        rendered = False
+        if not self.notModified and self.columns:
+            with self.measure("render"):
+                self.writeTable(writer)
+            rendered = True
+        if self.stats is not None:
+            self.reportColumnStats()
+            if self.columnStatsComment and rendered:
+                writer.write(self.renderColumnStats().encode())
+            zope.event.notify(stats.TableStatsEvent(self, self.stats))
+
+    def writeTable(self, writer):
+        """Writes the encoded table to the writer."""
+        buffer = bytearray()
+        size = self.renderBufferSize
+
+        def flush():
+            if len(buffer) >= size:
+                writer.write(bytes(buffer))
+                del buffer[:]
+
+        indents = self.getIndents()
+        buffer += "<table{}>{}{}{}<tbody{}>".format(
+            self.getCSSClass("table"),
+            self.renderColGroup(),
+            self.renderHead(),
+            indents[1],
+            self.getCSSClass("tbody"),
+        ).encode()
+        with self.measure("renderRows"):
+            result = None
+            if self.canRenderParallel():
+                from z3c.table import parallel
+                result = parallel.renderRows(self)
+            if result is not None:
+                counter = len(self.rows)
+                if self.stats is not None:
+                    self.stats.addCount("parallelRows", counter)
+                buffer += result.encode()
+            else:
+                counter = self.writeRows(buffer, flush)
+            if self.incomplete:
+                buffer += self.renderIncompleteRow().encode()
+            self.addRenderCounts(counter)
+        buffer += "{}</tbody>{}{}</table>".format(
+            indents[1], self.renderFoot(), indents[0]
+        ).encode()
+        writer.write(bytes(buffer))
+
+    def measure(self, phase):
+        """Returns a context manager adding its duration to the phase."""
+        if self.stats is None:
+            return stats.nullPhase
+        return self.stats.phase(phase)
 
     def update(self):
         # reset values
         self.columnCounter = 0
         self.columnByIndex = {}
         self.selectedItems = []
+        self.filters = {}
+        self.aggregates = {}
+        self.groups = []
+        self.rowGroups = None
+        self.rowKeys = None
+        self.notModified = False
+        self.validatorValues = None
+        self.sortGhosts = None
+        self.activatedItems = 0
+        self.budgetExceeded = None
+        self.incomplete = False
+        self.deadline = None
+        self.deadlineName = None
+        deadlines = self.getDeadlines()
+        if deadlines:
+            # the earliest deadline wins
+            self.deadlineName, self.deadline = min(
+                deadlines, key=lambda deadline: deadline[1])
+        if self.collectStats or self.collectColumnStats:
+            self.stats = stats.TableStats()
+        else:
+            self.stats = None
 
         # use batch values from request or the existing ones
         self.batchSize = self.getBatchSize()
@@ -355,28 +2012,101 @@ class Table(zope.location.Location):
         self.sortOrder = self.getSortOrder()
 
         # initialize columns
-        self.initColumns()
+        with self.measure("initColumns"):
+            self.initColumns()
+
+        # clamp the batch size to the render budget
+        self.applyBudget()
+
+        # get the filter queries from the request
+        self.filters = self.getFilters()
+
+        # answer conditional requests before any row gets set up
+        if self.conditionalGet:
+            with self.measure("conditionalGet"):
+                self.notModified = self.handleConditionalGet()
+            if self.notModified:
+                self.batchProvider = None
+                self.rows = []
+                self.sortedRows = []
+                if self.sortGhosts is not None:
+                    self.deactivateGhosts()
+                return
 
         # update columns
-        self.updateColumns()
+        with self.measure("updateColumns"):
+            self.updateColumns()
 
         # setup headers based on columns
-        self.rows = self.setUpRows()
+        with self.measure("setUpRows"):
+            self.rows = self.setUpRows()
+        if self.stats is not None:
+            self.stats.addCount("rows", len(self.rows))
 
         # sort items on columns
-        self.sortRows()
+        with self.measure("sortRows"):
+            self.sortRows()
+        # order the sorted rows by group
+        if self.groupOn:
+            with self.measure("groupRows"):
+                self.groupRows()
+        # keep all sorted rows for row ranges outside the batch
+        self.sortedRows = self.rows
 
         # batch sorted rows
-        self.batchRows()
+        with self.measure("batchRows"):
+            self.batchRows()
+
+        if self.sortGhosts is not None:
+            with self.measure("deactivateGhosts"):
+                self.deactivateGhosts()
+
+        if self.prefetchItems:
+            with self.measure("prefetchRows"):
+                self.prefetchRows()
 
-        self.updateBatch()
+        with self.measure("updateBatch"):
+            self.updateBatch()
 
     def render(self):
 
         # allow to use a template for rendering the table, this will allow
         # to position the batch before and after the table
 
-        return self.renderTable()
+        if self.notModified:
+            result = ""
+        else:
+            with self.measure("render"):
+                result = self.renderTable()
+        if self.stats is not None:
+            self.reportColumnStats()
+            if self.columnStatsComment and result:
+                result += self.renderColumnStats()
+            zope.event.notify(stats.TableStatsEvent(self, self.stats))
+        return result
+
+    def renderColumnStats(self):
+        """Returns the column statistics as HTML comment."""
+        if self.stats is None or not self.stats.columns:
+            return ""
+        lines = self.stats.getColumnReport()
+        # a comment must not contain a double hyphen
+        report = "\n".join(lines).replace("--", "- -")
+        return f"\n<!-- column stats\n{report}\n-->"
+
+    def reportColumnStats(self):
+        """Logs the column statistics if the table was slow."""
+        threshold = self.slowRenderThreshold
+        if threshold is None or not self.stats.columns:
+            return
+        elapsed = self.stats.elapsed()
+        if elapsed > threshold:
+            logger.warning(
+                "Slow table %r took %.3fs, column stats:\n%s",
+                self,
+                elapsed,
+                "\n".join(self.stats.getColumnReport()),
+            )
 
     def __repr__(self):
         return f"<{self.__class__.__name__} {self.__name__!r}>"
@@ -18,9 +18,11 @@ __docformat__ = "reStructuredText"
 
 import datetime
 
+import persistent
 import zope.component
 import zope.interface
 import zope.traversing.testing
+from ZODB.MappingStorage import MappingStorage
 from zope.container import btree
 from zope.container import contained
 from zope.container import ordered
@@ -31,6 +33,7 @@ from zope.site.testing import siteTearDown
 
 import z3c.table.value
 from z3c.table import column
+from z3c.table import sortindex
 from z3c.table import table
 
 
@@ -75,6 +78,43 @@ class Content(contained.Contained):
         self.number = number
 
 
+class PersistentContent(persistent.Persistent, Content):
+    """Sample persistent content."""
+
+
+class PrefetchStorage(MappingStorage):
+    """Mapping storage behaving like a storage with a remote server.
+
+    The records of prefetched oids get fetched in one round trip and kept in
+    a local cache, all other loads count as a round trip.
+    """
+
+    def __init__(self, name="PrefetchStorage"):
+        super().__init__(name)
+        self.prefetches = []
+        self.roundTrips = 0
+        self.prefetched = {}
+
+    def prefetch(self, oids, tid):
+        oids = list(oids)
+        self.prefetches.append(len(oids))
+        self.roundTrips += 1
+        for oid in oids:
+            self.prefetched[(oid, tid)] = super().loadBefore(oid, tid)
+
+    def loadBefore(self, oid, tid):
+        record = self.prefetched.pop((oid, tid), None)
+        if record is None:
+            self.roundTrips += 1
+            record = super().loadBefore(oid, tid)
+        return record
+
+    def reset(self):
+        self.prefetches = []
+        self.roundTrips = 0
+        self.prefetched.clear()
+
+
 class SimpleTable(table.Table):
     def setUpColumns(self):
         return [
@@ -92,6 +132,9 @@ class SimpleTable(table.Table):
         ]
 
 
+titleSortIndexer = sortindex.AttributeSortIndexer("title")
+
+
 def headCellRenderer():
     return "My items"
 
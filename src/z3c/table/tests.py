@@ -11,9 +11,15 @@
 # FOR A PARTICULAR PURPOSE.
 #
 ##############################################################################
+import contextlib
 import doctest
+import io
+import json
+import os
 import re
+import tempfile
 import unittest
+from xml.sax import saxutils
 
 import zope.traversing.testing
 from z3c.batching.batch import Batch
@@ -24,6 +30,8 @@ from zope.site.testing import siteTearDown
 from zope.testing.renormalizing import RENormalizing
 
 from z3c.table import batch
+from z3c.table import benchmark
+from z3c.table import collation
 from z3c.table import column
 from z3c.table import interfaces
 from z3c.table import table
@@ -93,6 +101,10 @@ class TestTable(InterfaceBaseTest, unittest.TestCase):
     def getTestPos(self):
         return (FakeContainer(), TestRequest())
 
+    def test_quoteattr(self):
+        for value in ("", "foo bar", 'a "b"', "a 'b'", "\"'<&>\n\r\t"):
+            self.assertEqual(table.quoteattr(value), saxutils.quoteattr(value))
+
 
 class TestSequenceTable(InterfaceBaseTest, unittest.TestCase):
     def setUp(test):
@@ -419,6 +431,98 @@ class TestBatchProvider(InterfaceBaseTest, unittest.TestCase):
         return ({}, TestRequest(), t)
 
 
+# benchmark
+class TestBenchmark(unittest.TestCase):
+    def runMain(self, *args):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            results = benchmark.main(["--sizes", "5", "--repeat", "1"]
+                                     + list(args))
+        return results, out.getvalue()
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "results.json")
+            results, out = self.runMain("--output", output)
+            with open(output) as f:
+                self.assertEqual(json.load(f)["results"], results["results"])
+        self.assertEqual(
+            [(r["dataset"], r["size"], r["columns"])
+             for r in results["results"]],
+            [("container", 5, "all"), ("sequence", 5, "all")],
+        )
+        self.assertEqual(
+            sorted(results["results"][0]["timings"]),
+            sorted(benchmark.PHASES + benchmark.NESTED_PHASES + ("total",)),
+        )
+        self.assertIn("container        5 all", out)
+
+    def test_each_column(self):
+        results, out = self.runMain(
+            "--datasets", "sequence", "--columns", "name,link",
+            "--each-column", "--sort-on", "none", "--batch-size", "0")
+        self.assertEqual(
+            [r["columns"] for r in results["results"]], ["name", "link"]
+        )
+        self.assertRaises(ValueError, benchmark.getColumnTypes, "foo")
+
+    def test_column_definitions(self):
+        results, out = self.runMain(
+            "--datasets", "container", "--column-definitions")
+        self.assertEqual(results["results"][0]["counts"]["renderedCells"],
+                         5 * len(benchmark.COLUMNS))
+
+    def test_render_processes(self):
+        results, out = self.runMain(
+            "--datasets", "container", "--columns", "getattr,getitem",
+            "--render-processes", "2", "--batch-size", "0")
+        self.assertEqual(results["results"][0]["counts"]["renderedRows"], 5)
+
+    def test_compact(self):
+        results, out = self.runMain("--datasets", "container")
+        compact, out = self.runMain(
+            "--datasets", "container", "--compact", "--css-classes-on-cols")
+        self.assertLess(
+            compact["results"][0]["counts"]["renderedBytes"],
+            results["results"][0]["counts"]["renderedBytes"],
+        )
+
+    def test_collate(self):
+        results, out = self.runMain(
+            "--datasets", "container", "--columns", "getattr", "--collate")
+        self.assertTrue(results["options"]["collate"])
+        self.assertEqual(results["results"][0]["counts"]["sortKeys"], 5)
+        self.assertTrue(any(
+            "Title 0" in keys for keys in collation.collationKeys.values()
+        ))
+
+    def test_import_time(self):
+        results, out = self.runMain("--import-time", "--sizes", "0")
+        self.assertEqual(results["results"], [])
+        self.assertEqual(
+            sorted(results["importTimes"]), sorted(benchmark.IMPORT_MODULES)
+        )
+        self.assertIn("import z3c.table.table", out)
+
+    def test_lazy_imports(self):
+        self.assertIn(
+            "zope.dublincore",
+            benchmark.getImportedModules(["z3c.table.testing"]),
+        )
+        self.assertEqual(
+            benchmark.getEagerLazyModules(benchmark.IMPORT_MODULES), []
+        )
+
+    def test_compare(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "results.json")
+            self.runMain("--datasets", "container", "--output", output)
+            results, out = self.runMain(
+                "--datasets", "container", "--compare", output)
+        self.assertIn("Ratio compared with", out)
+        self.assertIn("container 5 all: initColumns=", out)
+
+
 class Mock:
     pass
 
@@ -481,6 +585,104 @@ def test_suite():
                 checker=checker,
                 optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
             ),
+            doctest.DocFileSuite(
+                "filter.rst",
+                setUp=testing.setUp,
+                tearDown=testing.tearDown,
+                checker=checker,
+                optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+            ),
+            doctest.DocFileSuite(
+                "rowdiff.rst",
+                setUp=testing.setUp,
+                tearDown=testing.tearDown,
+                checker=checker,
+                optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+            ),
+            doctest.DocFileSuite(
+                "conditional.rst",
+                setUp=testing.setUp,
+                tearDown=testing.tearDown,
+                checker=checker,
+                optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+            ),
+            doctest.DocFileSuite(
+                "rowrange.rst",
+                setUp=testing.setUp,
+                tearDown=testing.tearDown,
+                checker=checker,
+                optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+            ),
+            doctest.DocFileSuite(
+                "parallel.rst",
+                setUp=testing.setUp,
+                tearDown=testing.tearDown,
+                checker=checker,
+                optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+            ),
+            doctest.DocFileSuite(
+                "sortindex.rst",
+                setUp=testing.setUp,
+                tearDown=testing.tearDown,
+                checker=checker,
+                optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+            ),
+            doctest.DocFileSuite(
+                "persistent.rst",
+                setUp=testing.setUp,
+                tearDown=testing.tearDown,
+                checker=checker,
+                optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+            ),
+            doctest.DocFileSuite(
+                "writer.rst",
+                setUp=testing.setUp,
+                tearDown=testing.tearDown,
+                checker=checker,
+                optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+            ),
+            doctest.DocFileSuite(
+                "compact.rst",
+                setUp=testing.setUp,
+                tearDown=testing.tearDown,
+                checker=checker,
+                optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+            ),
+            doctest.DocFileSuite(
+                "budget.rst",
+                setUp=testing.setUp,
+                tearDown=testing.tearDown,
+                checker=checker,
+                optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+            ),
+            doctest.DocFileSuite(
+                "aggregate.rst",
+                setUp=testing.setUp,
+                tearDown=testing.tearDown,
+                checker=checker,
+                optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+            ),
+            doctest.DocFileSuite(
+                "group.rst",
+                setUp=testing.setUp,
+                tearDown=testing.tearDown,
+                checker=checker,
+                optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+            ),
+            doctest.DocFileSuite(
+                "collation.rst",
+                setUp=testing.setUp,
+                tearDown=testing.tearDown,
+                checker=checker,
+                optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+            ),
+            doctest.DocFileSuite(
+                "stats.rst",
+                setUp=testing.setUp,
+                tearDown=testing.tearDown,
+                checker=checker,
+                optionflags=doctest.NORMALIZE_WHITESPACE | doctest.ELLIPSIS,
+            ),
             unittest.defaultTestLoader.loadTestsFromName(__name__),
         )
     )
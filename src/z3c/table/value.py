@@ -52,3 +52,63 @@ class ValuesForSequence(ValuesMixin):
     @property
     def values(self):
         return self.context
+
+
+@zope.interface.implementer(interfaces.ISliceableValues)
+class SliceableValues:
+    """Marks a lazy sequence like a catalog result set as sliceable."""
+
+    def __init__(self, sequence):
+        self.sequence = sequence
+
+    def __len__(self):
+        return len(self.sequence)
+
+    def __getitem__(self, idx):
+        return self.sequence[idx]
+
+    def __iter__(self):
+        return iter(self.sequence)
+
+
+class SlicedRows:
+    """Rows of sliceable values.
+
+    Only the items of the requested slice get resolved and set up, which
+    allows to batch the rows without touching all items.
+    """
+
+    def __init__(self, table, values):
+        self.table = table
+        self.values = values
+        # the last slice and its rows, the batch iterates more than once
+        self.cache = (None, None)
+
+    def __len__(self):
+        return len(self.values)
+
+    def getItems(self, start, stop):
+        return self.values[start:stop]
+
+    def getRows(self, start, stop):
+        key, rows = self.cache
+        if key != (start, stop):
+            setUpRow = self.table.setUpRow
+            rows = [setUpRow(item) for item in self.getItems(start, stop)]
+            self.cache = ((start, stop), rows)
+        return rows
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(len(self))
+            if step != 1:
+                return self.getRows(0, len(self))[idx]
+            return list(self.getRows(start, stop))
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        return self.getRows(idx, idx + 1)[0]
+
+    def __iter__(self):
+        return iter(self.getRows(0, len(self)))